@@ -1,13 +1,32 @@
 import sqlite3
-import pandas as pd
-import numpy as np
-from flask import Flask, jsonify, request, g, send_from_directory
-from datetime import datetime
+from flask import Flask, Response, jsonify, request, g, send_from_directory, has_app_context, stream_with_context
+from datetime import datetime, timezone
 from flask_cors import CORS
 import os
 import sys
 import io
 import json
+import threading
+import hashlib
+import base64
+import traceback
+import uuid
+import time
+import re
+import queue
+import functools
+import collections
+import argparse
+import signal
+import gzip
+import zlib
+from contextlib import contextmanager
+# pandas e numpy têm import lento: são carregados só nas funções de
+# sincronização e evolução que os usam, fora do caminho de inicialização
+try:
+    import brotli  # Opcional: sem ele, as respostas são comprimidas só com gzip
+except ImportError:
+    brotli = None
 
 # --- Bloco de Caminhos Corrigido ---
 # Determina o caminho base, seja rodando como script ou como executável
@@ -37,14 +56,16 @@ else:
 
 
 # --- BLOCO DE DEPURAÇÃO ---
-print("=== INICIANDO DEPURAÇÃO DE CAMINHOS ===")
-print(f"O script está rodando como executável? {getattr(sys, 'frozen', False)}")
-print(f"Caminho Base (base_path) = {base_path}")
-print(f"Caminho do Frontend (frontend_folder) = {frontend_folder}")
-index_html_path = os.path.join(frontend_folder, 'index.html')
-print(f"Caminho esperado para o index.html = {index_html_path}")
-print(f"O arquivo index.html existe nesse caminho? {os.path.exists(index_html_path)}")
-print("--- FIM DA DEPURAÇÃO ---")
+# Só com PLANO_DEBUG_PATHS=1, para não pesar na inicialização
+if os.environ.get('PLANO_DEBUG_PATHS') == '1':
+    print("=== INICIANDO DEPURAÇÃO DE CAMINHOS ===")
+    print(f"O script está rodando como executável? {getattr(sys, 'frozen', False)}")
+    print(f"Caminho Base (base_path) = {base_path}")
+    print(f"Caminho do Frontend (frontend_folder) = {frontend_folder}")
+    index_html_path = os.path.join(frontend_folder, 'index.html')
+    print(f"Caminho esperado para o index.html = {index_html_path}")
+    print(f"O arquivo index.html existe nesse caminho? {os.path.exists(index_html_path)}")
+    print("--- FIM DA DEPURAÇÃO ---")
 # --- FIM DO BLOCO DE DEPURAÇÃO ---
 
 app = Flask(__name__, static_folder=frontend_folder)
@@ -52,7 +73,34 @@ app = Flask(__name__, static_folder=frontend_folder)
 CORS(app, resources={r"/api/*": {"origins": "file://*"}})
 
 # --- Gerenciamento da Conexão ---
-def get_db_connection():
+# Perfis de armazenamento do SQLite, selecionados pela variável PLANO_DB_PROFILE.
+# 'performance' usa WAL para que leitores (dashboards) não bloqueiem durante as
+# escritas do timer; 'compat' mantém o journal tradicional.
+STORAGE_PROFILES = {
+    'performance': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'mmap_size': 64 * 1024 * 1024,
+        'cache_size': -16000,  # valores negativos são em KiB (~16 MB)
+        'temp_store': 'MEMORY',
+        'busy_timeout': 5000,
+    },
+    'compat': {
+        'journal_mode': 'DELETE',
+        'synchronous': 'FULL',
+        'busy_timeout': 5000,
+    },
+}
+storage_profile_name = os.environ.get('PLANO_DB_PROFILE', 'performance')
+if storage_profile_name not in STORAGE_PROFILES:
+    print(f"Perfil de armazenamento desconhecido '{storage_profile_name}', usando 'performance'")
+    storage_profile_name = 'performance'
+storage_profile = STORAGE_PROFILES[storage_profile_name]
+
+def resolve_db_file():
+    # Permite apontar para outro banco (ex.: benchmarks com uma cópia do data.db)
+    if os.environ.get('PLANO_DB_FILE'):
+        return os.environ['PLANO_DB_FILE']
     if getattr(sys, 'frozen', False):
         # Modo produção: tudo na mesma pasta do executável (dist)
         executable_dir = os.path.dirname(sys.executable)  # Pasta do executável (dist)
@@ -64,30 +112,495 @@ def get_db_connection():
     else:
         # Modo desenvolvimento
         db_file = os.path.join(base_path, 'data.db')
-    
-    
+    return db_file
+
+# Resolvido uma única vez na inicialização
+db_file = resolve_db_file()
+
+class PlanoConnection(sqlite3.Connection):
+    """Conexão que guarda o estado da unidade de trabalho em andamento (ver unit_of_work)."""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.uow_depth = 0
+        self.after_commit = []
+
+def open_db_connection():
+    """Abre uma conexão nova já configurada (row_factory e PRAGMAs)."""
     try:
-        conn = sqlite3.connect(db_file)
-        conn.row_factory = sqlite3.Row
-        conn.execute("PRAGMA foreign_keys = ON")
-        return conn
+        conn = sqlite3.connect(db_file, check_same_thread=False, factory=PlanoConnection)
     except sqlite3.Error as e:
         print(f"Erro ao conectar com banco: {e}")
         # Tenta criar um novo se falhar
         open(db_file, 'w').close()
-        return sqlite3.connect(db_file)
+        conn = sqlite3.connect(db_file, check_same_thread=False, factory=PlanoConnection)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA foreign_keys = ON")
+    for pragma, value in storage_profile.items():
+        conn.execute(f"PRAGMA {pragma} = {value}")
+    return conn
+
+class ConnectionPool:
+    """
+    Pool thread-safe de conexões SQLite pré-configuradas.
+    As conexões devolvidas ficam ociosas para reuso até o limite max_idle.
+    """
+    def __init__(self, factory, max_idle=4):
+        self._factory = factory
+        self._max_idle = max_idle
+        self._idle = []
+        self._lock = threading.Lock()
+        self._open = 0
+        self._checked_out = 0
+        self._created_total = 0
+        self._reused_total = 0
+
+    def acquire(self):
+        with self._lock:
+            if self._idle:
+                conn = self._idle.pop()
+                self._checked_out += 1
+                self._reused_total += 1
+                return conn
+        conn = self._factory()
+        with self._lock:
+            self._open += 1
+            self._checked_out += 1
+            self._created_total += 1
+        return conn
+
+    def release(self, conn):
+        try:
+            # Descarta qualquer transação que o request tenha deixado aberta
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            self._discard(conn)
+            return
+        with self._lock:
+            self._checked_out -= 1
+            if len(self._idle) < self._max_idle:
+                self._idle.append(conn)
+                return
+            self._open -= 1
+        conn.close()
+
+    def _discard(self, conn):
+        with self._lock:
+            self._checked_out -= 1
+            self._open -= 1
+        try: conn.close()
+        except sqlite3.Error: pass
+
+    def close_idle(self):
+        """Fecha as conexões ociosas (no encerramento do servidor)."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+            self._open -= len(idle)
+        for conn in idle:
+            try: conn.close()
+            except sqlite3.Error: pass
+
+    def metrics(self):
+        with self._lock:
+            return {
+                "open": self._open,
+                "checked_out": self._checked_out,
+                "idle": len(self._idle),
+                "max_idle": self._max_idle,
+                "created_total": self._created_total,
+                "reused_total": self._reused_total,
+            }
+
+db_pool = ConnectionPool(open_db_connection)
+
+def get_db_connection():
+    """Retorna a conexão do request atual, obtida do pool uma única vez por request."""
+    if not has_app_context():
+        # Fora de um request o chamador é responsável por fechar a conexão
+        return open_db_connection()
+    conn = getattr(g, '_database', None)
+    if conn is None:
+        conn = g._database = db_pool.acquire()
+    return conn
 
 @app.teardown_appcontext
 def close_connection(exception):
-    conn = getattr(g, '_database', None)
+    conn = g.pop('_database', None)
     if conn is not None:
-        conn.close()
+        db_pool.release(conn)
+
+@contextmanager
+def unit_of_work(conn, immediate=True):
+    """
+    Escopo transacional aninhável. Só o escopo mais externo faz commit (uma
+    vez, no final) ou rollback, se uma exceção escapar. Funções auxiliares
+    não fazem commit; quem abre a unidade de trabalho decide.
+
+    O escopo mais externo abre a transação com BEGIN IMMEDIATE: o lock de
+    escrita vale desde a primeira leitura, então a pegada "antes" de uma
+    tarefa e o delta aplicado não se misturam com a escrita de outra thread.
+    immediate=False deixa a transação para a primeira escrita (leituras).
+    """
+    if conn.uow_depth == 0 and immediate and not conn.in_transaction:
+        conn.execute("BEGIN IMMEDIATE")
+    conn.uow_depth += 1
+    try:
+        yield conn
+    except BaseException:
+        conn.uow_depth -= 1
+        if conn.uow_depth == 0:
+            conn.after_commit.clear()
+            conn.rollback()
+        raise
+    conn.uow_depth -= 1
+    if conn.uow_depth == 0:
+        conn.commit()
+        callbacks, conn.after_commit[:] = list(conn.after_commit), []
+        for callback in callbacks:
+            callback()
+
+def run_after_commit(conn, callback):
+    """Executa callback depois do commit da unidade de trabalho atual (ou já, se não houver uma)."""
+    if getattr(conn, 'uow_depth', 0):
+        conn.after_commit.append(callback)
+    else:
+        callback()
+
+def transactional(view):
+    """Executa a view em uma unidade de trabalho: um commit por request, ou rollback se falhar."""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        with unit_of_work(get_db_connection(), immediate=request.method not in ('GET', 'HEAD')):
+            return view(*args, **kwargs)
+    return wrapper
+
+# --- Cache de Respostas ---
+# Endpoints de leitura do painel guardam a resposta pronta em memória. Cada
+# entrada registra a versão das tabelas de que depende; os caminhos de escrita
+# chamam touch_tables, que incrementa essas versões após o commit, e a entrada
+# antiga deixa de valer. As respostas levam ETag para revalidação com 304.
+class ResponseCache:
+    """Cache LRU thread-safe de respostas, invalidado por versão de tabela."""
+    def __init__(self, max_entries=128):
+        self._max_entries = max_entries
+        self._entries = collections.OrderedDict()
+        self._versions = {}
+        self._epoch = 0  # Incrementado quando "todas as tabelas" mudam
+        self._lock = threading.Lock()
+        self._hits = self._misses = self._stale = self._not_modified = self._evictions = 0
+
+    def versions(self, tables):
+        with self._lock:
+            return (self._epoch,) + tuple(self._versions.get(table, 0) for table in tables)
+
+    def bump(self, tables=()):
+        """Invalida as tabelas informadas (ou todas, se nenhuma for informada)."""
+        with self._lock:
+            if not tables:
+                self._epoch += 1
+            for table in tables:
+                self._versions[table] = self._versions.get(table, 0) + 1
+
+    def get(self, key, versions):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry['versions'] == versions:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return entry
+            if entry is not None:
+                del self._entries[key]
+                self._stale += 1
+            self._misses += 1
+            return None
+
+    def store(self, key, versions, body, mimetype):
+        entry = {'versions': versions, 'body': body, 'mimetype': mimetype,
+                 'etag': hashlib.sha1(body).hexdigest()}
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+        return entry
+
+    def record_not_modified(self):
+        with self._lock:
+            self._not_modified += 1
+
+    def metrics(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self._max_entries,
+                "hits": self._hits,
+                "misses": self._misses,
+                "stale": self._stale,
+                "not_modified": self._not_modified,
+                "evictions": self._evictions,
+                "hit_ratio": round(self._hits / lookups, 4) if lookups else None,
+                "table_versions": dict(self._versions, _all=self._epoch),
+            }
+
+response_cache = ResponseCache()
+
+def touch_tables(conn, *tables):
+    """Registra a escrita nas tabelas; o cache é invalidado depois do commit (sem tabelas: tudo)."""
+    run_after_commit(conn, lambda: response_cache.bump(tables))
+
+def cached_response(*tables):
+    """
+    Serve a view GET do cache enquanto as tabelas informadas não mudarem. A
+    chave é rota + query string + data de hoje (janelas relativas a 'now').
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            key = (request.path, tuple(sorted(request.args.items(multi=True))), wants_ndjson(),
+                   datetime.now().strftime('%Y-%m-%d'))
+            # Versões lidas antes da consulta: uma escrita concorrente torna a entrada obsoleta
+            versions = response_cache.versions(tables)
+            entry = response_cache.get(key, versions)
+            if entry is None:
+                response = app.make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                entry = response_cache.store(key, versions, response.get_data(), response.mimetype)
+            response = conditional_response(entry['body'], entry['etag'], entry['mimetype'],
+                                            encoded=entry.setdefault('encoded', {}))
+            if response.status_code == 304:
+                response_cache.record_not_modified()
+            response.vary.add('Accept')
+            return response
+        return wrapper
+    return decorator
+
+def conditional_response(body, etag, mimetype='application/json', encoded=None):
+    """
+    Resposta com ETag forte; 304 sem corpo se o cliente já tiver essa versão.
+    Cada codificação (gzip, br) é uma variante com ETag própria; o corpo
+    comprimido fica guardado em 'encoded' para os próximos requests.
+    """
+    encoding = negotiate_encoding() if len(body) >= COMPRESS_MIN_SIZE else None
+    variant_etag = f"{etag}-{encoding}" if encoding else etag
+    if request.if_none_match.contains(variant_etag):
+        response = app.response_class(status=304)
+    else:
+        if encoding:
+            encoded = {} if encoded is None else encoded
+            if encoding not in encoded:
+                encoded[encoding] = compress_bytes(body, encoding)
+            body = encoded[encoding]
+        response = app.response_class(body, mimetype=mimetype)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+    response.set_etag(variant_etag)
+    response.vary.add('Accept-Encoding')
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+# --- Compressão de Respostas ---
+# gzip (e brotli, se instalado) negociado por Accept-Encoding. Respostas em
+# streaming são comprimidas lote a lote, com flush a cada lote.
+COMPRESS_MIN_SIZE = 1024
+COMPRESS_LEVEL = 6
+BROTLI_QUALITY = 5
+COMPRESSIBLE_MIMETYPES = {'application/json', 'application/x-ndjson', 'text/html', 'text/css',
+                          'text/plain', 'text/javascript', 'application/javascript', 'image/svg+xml'}
+
+def negotiate_encoding():
+    """'br', 'gzip' ou None, conforme o Accept-Encoding do request."""
+    return request.accept_encodings.best_match(['br', 'gzip'] if brotli else ['gzip'])
+
+def compress_bytes(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=COMPRESS_LEVEL)
+
+def compress_stream(chunks, encoding):
+    """Comprime um corpo em streaming sem perder o envio progressivo dos pedaços."""
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        compress, flush, finish = compressor.process, compressor.flush, compressor.finish
+    else:
+        compressor = zlib.compressobj(COMPRESS_LEVEL, zlib.DEFLATED, 31)  # wbits=31: formato gzip
+        compress, flush, finish = compressor.compress, lambda: compressor.flush(zlib.Z_SYNC_FLUSH), compressor.flush
+    try:
+        for chunk in chunks:
+            data = compress(chunk.encode('utf-8') if isinstance(chunk, str) else chunk) + flush()
+            if data:
+                yield data
+        yield finish()
+    finally:
+        # Fecha o gerador original (libera a conexão do stream_with_context)
+        if hasattr(chunks, 'close'):
+            chunks.close()
+
+@app.after_request
+def compress_response(response):
+    if (response.status_code != 200 or response.direct_passthrough
+            or 'Content-Encoding' in response.headers or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = negotiate_encoding()
+    if encoding is None:
+        return response
+    if response.is_streamed:
+        response.response = compress_stream(response.response, encoding)
+    else:
+        data = response.get_data()
+        if len(data) < COMPRESS_MIN_SIZE:
+            return response
+        response.set_data(compress_bytes(data, encoding))
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag(f"{etag}-{encoding}", weak)
+    return response
 
 # --- API Endpoints ---
+# Paginação por cursor (keyset): o cursor guarda a chave de ordenação do último
+# item da página, e a próxima página começa logo depois dela usando o índice,
+# com custo constante por página (sem OFFSET).
+PAGE_SIZE_DEFAULT = 50
+PAGE_SIZE_MAX = 200
+
+def page_size_arg():
+    limit = request.args.get('limit', default=PAGE_SIZE_DEFAULT, type=int)
+    return max(1, min(limit, PAGE_SIZE_MAX))
+
+def encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(list(values)).encode()).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    """Retorna os valores do cursor, None se ausente; ValueError se inválido."""
+    if not cursor:
+        return None
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (ValueError, TypeError) as e:
+        raise ValueError("cursor inválido") from e
+    if not isinstance(values, list) or len(values) != 2:
+        raise ValueError("cursor inválido")
+    return values
+
+def paginate(rows, limit, cursor_fields):
+    """Monta a página a partir de limit + 1 linhas: a linha extra indica que há mais."""
+    items = [dict(row) for row in rows[:limit]]
+    next_cursor = None
+    if len(rows) > limit:
+        next_cursor = encode_cursor(items[-1][field] for field in cursor_fields)
+    return {"items": items, "next_cursor": next_cursor}
+
+# Listas grandes saem em streaming: o cursor é lido em lotes (fetchmany) e cada
+# lote é serializado e enviado antes do próximo, sem montar a lista inteira em
+# memória. O corpo é o mesmo array JSON de antes, ou NDJSON (um objeto por
+# linha) se o cliente enviar Accept: application/x-ndjson. Com ?format=columns
+# o corpo é colunar: {"columns": [...], "rows": [[...], ...]}.
+STREAM_BATCH_SIZE = 500
+
+class InvalidArgument(ValueError):
+    """Parâmetro de query inválido; vira uma resposta 400."""
+
+@app.errorhandler(InvalidArgument)
+def handle_invalid_argument(error):
+    return jsonify({"error": str(error)}), 400
+
+# Projeção (?fields=a,b,c): só as colunas pedidas entram no SELECT
+_table_columns = {}
+
+def table_fields(table, alias):
+    """Mapa campo -> expressão SQL com todas as colunas da tabela (o schema é lido uma vez)."""
+    if table not in _table_columns:
+        _table_columns[table] = [row[1] for row in get_db_connection().execute(f"PRAGMA table_info({table})")]
+    return {column: f"{alias}.{column}" for column in _table_columns[table]}
+
+def requested_fields(available, always=()):
+    """Campos de ?fields= validados contra 'available' (None se o parâmetro não veio)."""
+    raw = request.args.get('fields')
+    if not raw:
+        return None
+    names = list(dict.fromkeys(always))
+    names += [name for name in dict.fromkeys(part.strip() for part in raw.split(',')) if name and name not in names]
+    unknown = [name for name in names if name not in available]
+    if unknown:
+        raise InvalidArgument(f"Campos desconhecidos: {', '.join(unknown)}")
+    return names
+
+def select_list(fields_map, default, always=()):
+    """
+    Lista de colunas do SELECT: default sem ?fields=, senão só as expressões
+    dos campos pedidos. Campos com expressão None são calculados fora do SQL.
+    Retorna (sql, campos pedidos ou None).
+    """
+    names = requested_fields(fields_map, always)
+    if names is None:
+        return default, None
+    columns = [f"{fields_map[name]} as {name}" for name in names if fields_map[name] is not None]
+    return ', '.join(columns), names
+
+def wants_ndjson():
+    return request.accept_mimetypes.best_match(['application/json', 'application/x-ndjson']) == 'application/x-ndjson'
+
+def stream_rows(cursor, transform=None, extra_columns=()):
+    """
+    Resposta em streaming com as linhas do cursor. transform converte um lote
+    de linhas em uma lista de dicts (padrão: dict(row)); extra_columns são as
+    chaves que ele acrescenta depois das colunas do cursor, para que o formato
+    colunar tenha as mesmas colunas mesmo sem nenhuma linha. A conexão do
+    request só volta ao pool quando o streaming termina (stream_with_context).
+    """
+    transform = transform or (lambda rows: [dict(row) for row in rows])
+    columnar = request.args.get('format') == 'columns'
+    ndjson = wants_ndjson() and not columnar
+    dumps = functools.partial(app.json.dumps, separators=(',', ':'))
+
+    def chunks():
+        try:
+            columns = None
+            first = True
+            while True:
+                rows = cursor.fetchmany(STREAM_BATCH_SIZE)
+                if not rows: break
+                items = transform(rows)
+                if ndjson:
+                    yield ''.join(dumps(item) + '\n' for item in items)
+                    continue
+                if columnar:
+                    if columns is None:
+                        columns = list(items[0])
+                        yield '{"columns":' + dumps(columns) + ',"rows":['
+                    items = [[item[column] for column in columns] for item in items]
+                elif first:
+                    yield '['
+                # Serializa o lote de uma vez e tira os colchetes externos
+                yield ('' if first else ',') + dumps(items)[1:-1]
+                first = False
+            if columnar:
+                if columns is None:
+                    columns = [column[0] for column in cursor.description or ()] + list(extra_columns)
+                    yield '{"columns":' + dumps(columns) + ',"rows":['
+                yield ']}'
+            elif not ndjson:
+                yield '[]' if first else ']'
+        finally:
+            cursor.close()
+
+    response = Response(stream_with_context(chunks()),
+                        mimetype='application/x-ndjson' if ndjson else 'application/json')
+    response.vary.add('Accept')
+    return response
+
 
 @app.route('/api/dashboard/summary', methods=['GET'])
+@cached_response('evolution', 'daily_stats', 'discipline')
 def get_dashboard_summary():
     conn = get_db_connection()
+    # Totais de todo o período vêm de evolution, que também conta a carga de
+    # tarefas sem data de conclusão e sessões sem início; daily_stats só tem
+    # o que cai em algum dia e serve a série semanal
     hours_by_discipline = conn.execute("""
         SELECT d.name as discipline_name, SUM(e.total_minutos_estudados) as total_minutes
         FROM evolution e
@@ -102,48 +615,88 @@ def get_dashboard_summary():
     return jsonify({
         "hours_by_discipline": [dict(row) for row in hours_by_discipline],
         "avg_percent_by_discipline": [dict(row) for row in avg_percent_by_discipline],
+        "weekly": rollup_daily_stats(conn, 'week', periods=8),
     })
 
+# Rollups derivados de daily_stats: expressão do início do período e
+# modificadores de date('now', ...) que recuam n períodos a partir do atual
+ROLLUP_PERIODS = {
+    'day': ("ds.day", lambda n: [f'-{n} days']),
+    'week': ("date(ds.day, 'weekday 0', '-6 days')", lambda n: ['weekday 0', '-6 days', f'-{7 * n} days']),
+    'month': ("strftime('%Y-%m-01', ds.day)", lambda n: ['start of month', f'-{n} months']),
+}
+
+def rollup_daily_stats(conn, period, periods, discipline_id=None):
+    """Totais por (período, disciplina) dos últimos 'periods' dias/semanas/meses, incluindo o atual."""
+    period_start, modifiers = ROLLUP_PERIODS[period]
+    modifiers = modifiers(periods - 1)
+    query = f"""
+        SELECT {period_start} as period_start, ds.discipline_id, d.name as discipline_name,
+               SUM(ds.study_minutes) as study_minutes, SUM(ds.sessions) as sessions,
+               SUM(ds.questions) as questions, SUM(ds.correct) as correct,
+               ROUND(CAST(SUM(ds.correct) AS FLOAT) / NULLIF(SUM(ds.questions), 0) * 100, 2) as accuracy,
+               SUM(ds.tasks_completed) as tasks_completed, SUM(ds.task_minutes) as task_minutes
+        FROM daily_stats ds
+        JOIN discipline d ON ds.discipline_id = d.id
+        WHERE ds.day >= date('now', {', '.join('?' * len(modifiers))})
+    """
+    params = list(modifiers)
+    if discipline_id:
+        query += " AND ds.discipline_id = ?"
+        params.append(discipline_id)
+    query += " GROUP BY period_start, ds.discipline_id ORDER BY period_start, d.name"
+    return [dict(row) for row in conn.execute(query, params)]
+
+@app.route('/api/stats/rollup', methods=['GET'])
+@cached_response('daily_stats', 'discipline')
+def get_stats_rollup():
+    period = request.args.get('period', default='week')
+    periods = request.args.get('periods', default=12, type=int)
+    if period not in ROLLUP_PERIODS:
+        raise InvalidArgument(f"period deve ser um de: {', '.join(ROLLUP_PERIODS)}")
+    if periods <= 0:
+        raise InvalidArgument("periods deve ser maior que zero")
+    return jsonify(rollup_daily_stats(get_db_connection(), period, periods,
+                                      request.args.get('discipline_id', type=int)))
+
 @app.route('/api/trilhas', methods=['GET'])
+@cached_response('trilha', 'task')
 def get_all_trilhas():
     conn = get_db_connection()
-    trilhas = conn.execute('SELECT * FROM trilha ORDER BY id').fetchall()
-    trilhas_list = []
-    for trilha in trilhas:
-        trilha_dict = dict(trilha)
-        pending_tasks = conn.execute(
-            "SELECT COUNT(id) as count FROM task WHERE trilha_id = ? AND status = 'Pendente'",
-            (trilha_dict['id'],)
-        ).fetchone()
-        trilha_dict['status'] = 'Concluída' if pending_tasks['count'] == 0 else 'Pendente'
-        trilhas_list.append(trilha_dict)
-    return jsonify(trilhas_list)
+    # Status, contagens e carga horária de todas as trilhas em uma única agregação
+    trilhas = conn.execute("""
+        SELECT 
+            tr.*,
+            CASE WHEN COUNT(CASE WHEN t.status = 'Pendente' THEN 1 END) = 0 THEN 'Concluída' ELSE 'Pendente' END as status,
+            COUNT(CASE WHEN t.status = 'Pendente' THEN 1 END) as pending_tasks,
+            COUNT(CASE WHEN t.status = 'Concluída' THEN 1 END) as completed_tasks,
+            COALESCE(SUM(t.carga_horaria_planejada_minutos), 0) as planned_minutes,
+            COALESCE(SUM(t.carga_horaria_realizada_minutos), 0) as realized_minutes
+        FROM trilha tr
+        LEFT JOIN task t ON t.trilha_id = tr.id
+        GROUP BY tr.id
+        ORDER BY tr.id
+    """).fetchall()
+    return jsonify([dict(row) for row in trilhas])
 
 @app.route('/api/trilhas/<int:trilha_id>/tasks', methods=['GET'])
 def get_tasks_for_trilha(trilha_id):
-    conn = get_db_connection()
-    tasks_rows = conn.execute("SELECT * FROM task WHERE trilha_id = ? ORDER BY id ASC", (trilha_id,)).fetchall()
-    tasks_list = []
-    for row in tasks_rows:
-        task_dict = dict(row)
-        topics = conn.execute("SELECT t.id, t.name FROM topic t JOIN task_topics tt ON t.id = tt.topic_id WHERE tt.task_id = ?", (task_dict['id'],)).fetchall()
-        task_dict['topics'] = [dict(t) for t in topics]
-        tasks_list.append(task_dict)
-    return jsonify(tasks_list)
+    return stream_tasks(get_db_connection(), "WHERE trilha_id = ?", (trilha_id,), "ORDER BY id ASC")
 
 @app.route('/api/disciplines', methods=['GET', 'POST'])
+@transactional
 def handle_disciplines():
     conn = get_db_connection()
     if request.method == 'GET':
-        disciplines = conn.execute('SELECT * FROM discipline ORDER BY name').fetchall()
-        return jsonify([dict(d) for d in disciplines])
+        columns, _ = select_list(table_fields('discipline', 'discipline'), '*')
+        return stream_rows(conn.execute(f'SELECT {columns} FROM discipline ORDER BY name'))
     if request.method == 'POST':
         data = request.get_json()
         if not data or not data.get('name'): return jsonify({"error": "O nome é obrigatório"}), 400
         try:
             cursor = conn.cursor()
             cursor.execute("INSERT INTO discipline (name) VALUES (?)", (data['name'],))
-            conn.commit()
+            touch_tables(conn, 'discipline')
             new_id = cursor.lastrowid
             new_discipline = conn.execute('SELECT * FROM discipline WHERE id = ?', (new_id,)).fetchone()
             return jsonify(dict(new_discipline)), 201
@@ -151,6 +704,7 @@ def handle_disciplines():
             return jsonify({"error": "Disciplina com este nome já existe"}), 409
 
 @app.route('/api/disciplines/<int:discipline_id>', methods=['PUT', 'DELETE'])
+@transactional
 def handle_discipline(discipline_id):
     conn = get_db_connection()
     if request.method == 'PUT':
@@ -158,23 +712,24 @@ def handle_discipline(discipline_id):
         if not data or not data.get('name'): return jsonify({"error": "O nome é obrigatório"}), 400
         try:
             conn.execute("UPDATE discipline SET name = ? WHERE id = ?", (data['name'], discipline_id))
-            conn.commit()
+            touch_tables(conn, 'discipline')
             updated = conn.execute('SELECT * FROM discipline WHERE id = ?', (discipline_id,)).fetchone()
             return jsonify(dict(updated))
         except sqlite3.IntegrityError:
             return jsonify({"error": "Disciplina com este nome já existe"}), 409
     if request.method == 'DELETE':
         conn.execute('DELETE FROM discipline WHERE id = ?', (discipline_id,))
-        conn.commit()
+        touch_tables(conn)  # A exclusão em cascata alcança praticamente todas as tabelas
         return jsonify({"message": "Disciplina e todos os dados associados foram deletados"})
 
 @app.route('/api/topics', methods=['GET'])
 def get_all_topics():
     conn = get_db_connection()
-    topics = conn.execute('SELECT * FROM topic ORDER BY name').fetchall()
-    return jsonify([dict(t) for t in topics])
+    columns, _ = select_list(table_fields('topic', 'topic'), '*')
+    return stream_rows(conn.execute(f'SELECT {columns} FROM topic ORDER BY name'))
 
 @app.route('/api/disciplines/<int:discipline_id>/topics', methods=['GET', 'POST'])
+@transactional
 def handle_topics_by_discipline(discipline_id):
     conn = get_db_connection()
     if request.method == 'GET':
@@ -185,48 +740,36 @@ def handle_topics_by_discipline(discipline_id):
         if not data or not data.get('name'): return jsonify({"error": "O nome é obrigatório"}), 400
         cursor = conn.cursor()
         cursor.execute("INSERT INTO topic (name, discipline_id) VALUES (?, ?)", (data['name'], discipline_id))
-        conn.commit()
+        touch_tables(conn, 'topic')
         new_id = cursor.lastrowid
         new_topic = conn.execute('SELECT * FROM topic WHERE id = ?', (new_id,)).fetchone()
         return jsonify(dict(new_topic)), 201
 
 @app.route('/api/topics/<int:topic_id>', methods=['PUT', 'DELETE'])
+@transactional
 def handle_topic(topic_id):
     conn = get_db_connection()
     if request.method == 'PUT':
         data = request.get_json()
         if not data or not data.get('name') or not data.get('discipline_id'): return jsonify({"error": "Nome e discipline_id são obrigatórios"}), 400
         conn.execute("UPDATE topic SET name = ?, discipline_id = ? WHERE id = ?", (data['name'], data['discipline_id'], topic_id))
-        conn.commit()
+        touch_tables(conn, 'topic')
         updated = conn.execute('SELECT * FROM topic WHERE id = ?', (topic_id,)).fetchone()
         return jsonify(dict(updated))
     if request.method == 'DELETE':
         conn.execute('DELETE FROM topic WHERE id = ?', (topic_id,))
-        conn.commit()
+        touch_tables(conn, 'topic', 'task_topics', 'topic_performance')
         return jsonify({"message": "Tópico deletado"})
 
 @app.route('/api/tasks', methods=['GET', 'POST'])
+@transactional
 def handle_tasks():
     conn = get_db_connection()
     if request.method == 'GET':
         status = request.args.get('status')
-        query = "SELECT * FROM task"
-        params = []
-        if status:
-            query += " WHERE status = ?"
-            params.append(status)
-        if status == 'Pendente':
-            query += " ORDER BY id ASC"
-        else:
-            query += " ORDER BY completion_date DESC, id DESC"
-        tasks_rows = conn.execute(query, params).fetchall()
-        tasks_list = []
-        for row in tasks_rows:
-            task_dict = dict(row)
-            topics = conn.execute("SELECT t.id, t.name FROM topic t JOIN task_topics tt ON t.id = tt.topic_id WHERE tt.task_id = ?", (task_dict['id'],)).fetchall()
-            task_dict['topics'] = [dict(t) for t in topics]
-            tasks_list.append(task_dict)
-        return jsonify(tasks_list)
+        where, params = ("WHERE status = ?", (status,)) if status else ('', ())
+        order_by = "ORDER BY id ASC" if status == 'Pendente' else "ORDER BY completion_date DESC, id DESC"
+        return stream_tasks(conn, where, params, order_by)
     if request.method == 'POST':
         data = request.get_json()
         cursor = conn.cursor()
@@ -236,24 +779,23 @@ def handle_tasks():
         if data.get('topic_ids'):
             for topic_id in data['topic_ids']:
                 cursor.execute("INSERT INTO task_topics (task_id, topic_id) VALUES (?, ?)", (task_id, topic_id))
-        conn.commit()
+        apply_task_delta(conn, None, get_task_footprint(conn, task_id))
+        touch_tables(conn, 'task', 'task_topics')
+        run_after_commit(conn, goal_evaluator.schedule)
         new_task = conn.execute('SELECT * FROM task WHERE id = ?', (task_id,)).fetchone()
         return jsonify(dict(new_task)), 201
 
 @app.route('/api/tasks/<int:task_id>', methods=['GET', 'PUT', 'DELETE'])
+@transactional
 def handle_task(task_id):
     conn = get_db_connection()
     if request.method == 'GET':
-        task = conn.execute('SELECT * FROM task WHERE id = ?', (task_id,)).fetchone()
-        if not task: return jsonify({"error": "Tarefa não encontrada"}), 404
-        task_dict = dict(task)
-        topics = conn.execute("SELECT t.id, t.name FROM topic t JOIN task_topics tt ON t.id = tt.topic_id WHERE tt.task_id = ?", (task_id,)).fetchall()
-        task_dict['topics'] = [dict(t) for t in topics]
-        return jsonify(task_dict)
+        return get_task_response(conn, task_id)
     if request.method == 'PUT':
         data = request.get_json()
         cursor = conn.cursor()
         carga_realizada_minutos = data.get('carga_horaria_realizada_minutos')
+        footprint_before = get_task_footprint(conn, task_id)
         
         current_task = conn.execute('SELECT status FROM task WHERE id = ?', (task_id,)).fetchone()
         if data.get('status') == 'Concluída' and current_task and current_task['status'] != 'Concluída':
@@ -271,21 +813,46 @@ def handle_task(task_id):
             for topic_id in data['topic_ids']:
                 cursor.execute("INSERT INTO task_topics (task_id, topic_id) VALUES (?, ?)", (task_id, topic_id))
         
-        conn.commit()
-        recalculate_evolution(conn)
+        apply_task_delta(conn, footprint_before, get_task_footprint(conn, task_id))
+        touch_tables(conn, 'task', 'task_topics')
+        run_after_commit(conn, goal_evaluator.schedule)
         
-        return handle_task(task_id)
+        return get_task_response(conn, task_id)
 
     if request.method == 'DELETE':
+        footprint_before = get_task_footprint(conn, task_id)
         conn.execute('DELETE FROM task WHERE id = ?', (task_id,))
-        conn.commit()
+        apply_task_delta(conn, footprint_before, None)
+        touch_tables(conn, 'task', 'task_topics', 'study_session', 'result')
+        run_after_commit(conn, goal_evaluator.schedule)
         return jsonify({"message": "Tarefa deletada"})
 
+def stream_tasks(conn, where, params, order_by):
+    """
+    Lista de tarefas em streaming, com ?fields= (o id sempre vem; 'topics' é
+    calculado à parte). Os tópicos de todas as tarefas do filtro são lidos
+    antes do streaming, em uma consulta só: o número de consultas não cresce
+    com a quantidade de lotes.
+    """
+    columns, names = select_list(dict(table_fields('task', 'task'), topics=None), '*', always=('id',))
+    cursor = conn.execute(' '.join(part for part in (f"SELECT {columns} FROM task", where, order_by) if part), params)
+    if names is not None and 'topics' not in names:
+        return stream_rows(cursor)
+    topics_by_task = task_topics_map(conn, where, params)
+    return stream_rows(cursor, lambda rows: attach_task_topics(conn, rows, topics_by_task), extra_columns=('topics',))
+
+def get_task_response(conn, task_id):
+    task = conn.execute('SELECT * FROM task WHERE id = ?', (task_id,)).fetchone()
+    if not task: return jsonify({"error": "Tarefa não encontrada"}), 404
+    return jsonify(attach_task_topics(conn, [task])[0])
+
 @app.route('/api/sessions/save', methods=['POST'])
+@transactional
 def save_session():
     data = request.get_json()
     conn = get_db_connection()
     cursor = conn.cursor()
+    footprint_before = get_task_footprint(conn, data.get('task_id'))
     
     # Inserir sessão
     cursor.execute('INSERT INTO study_session (task_id, start, "end", duration_minutes) VALUES (?, ?, ?, ?)',
@@ -315,36 +882,18 @@ def save_session():
         hour_milestones = [5, 10, 25, 50, 100]
         for milestone in hour_milestones:
             if study_time >= milestone:
-                # Verifica se já existe notificação para este milestone
-                notification_exists = conn.execute("""
-                    SELECT 1 FROM notification 
-                    WHERE type = 'achievement' 
-                    AND title LIKE ? 
-                    AND related_id = ?
-                """, (f'%{milestone} horas%', task_dict['discipline_id'])).fetchone()
-                
-                if not notification_exists:
-                    create_achievement_notification(
-                        conn,
-                        f"{milestone} horas de estudo em {task_dict['discipline_name']}! ⏰",
-                        f"Você já dedicou {milestone} horas ao estudo desta disciplina. Continue assim!",
-                        task_dict['discipline_id'],
-                        'discipline'
-                    )
+                # A chave de deduplicação garante uma notificação por marco
+                emit_notification(conn, 'discipline_hours', task_dict['discipline_id'], scope=milestone,
+                                  milestone=milestone, discipline_name=task_dict['discipline_name'])
         
         # Sessão longa (mais de 2 horas)
         if duration_hours >= 2:
-            create_achievement_notification(
-                conn,
-                "Sessão produtiva! 💪",
-                f"Você estudou {task_dict['discipline_name']} por {duration_hours:.1f} horas.",
-                session_id,
-                'study_session'
-            )
+            emit_notification(conn, 'long_session', session_id,
+                              discipline_name=task_dict['discipline_name'], hours=duration_hours)
     
-    conn.commit()
-    recalculate_evolution(conn)
-    check_goals_status(conn)  # Verifica se alguma meta foi alcançada
+    apply_task_delta(conn, footprint_before, get_task_footprint(conn, data.get('task_id')))
+    touch_tables(conn, 'study_session')
+    run_after_commit(conn, goal_evaluator.schedule)  # Verifica, em segundo plano, se alguma meta foi alcançada
     
     return jsonify({
         "message": "Sessão salva com sucesso", 
@@ -353,40 +902,65 @@ def save_session():
 
 @app.route('/api/sessions/history', methods=['GET'])
 def get_session_history():
+    """
+    Histórico paginado por cursor (start, id), do mais recente para o mais
+    antigo. Sessões sem início entram no fim: ordem e cursor usam
+    COALESCE(start, ''), já que uma comparação com NULL nunca é verdadeira.
+    """
     conn = get_db_connection()
-    history = conn.execute("""
+    conditions, params = ['s."end" IS NOT NULL'], []
+    discipline_id = request.args.get('discipline_id', type=int)
+    if discipline_id:
+        conditions.append("t.discipline_id = ?")
+        params.append(discipline_id)
+    try:
+        after = decode_cursor(request.args.get('cursor'))
+    except ValueError:
+        return jsonify({"error": "Cursor inválido"}), 400
+    if after:
+        conditions.append("(COALESCE(s.start, ''), s.id) < (COALESCE(?, ''), ?)")
+        params.extend(after)
+    limit = page_size_arg()
+    history = conn.execute(f"""
         SELECT s.id, s.start, s."end", s.duration_minutes, t.title as task_title, d.name as discipline_name
         FROM study_session s
         LEFT JOIN task t ON s.task_id = t.id
         LEFT JOIN discipline d ON t.discipline_id = d.id
-        WHERE s."end" IS NOT NULL ORDER BY s.start DESC LIMIT 20
-    """).fetchall()
-    return jsonify([dict(row) for row in history])
+        WHERE {' AND '.join(conditions)}
+        ORDER BY COALESCE(s.start, '') DESC, s.id DESC LIMIT ?
+    """, params + [limit + 1]).fetchall()
+    return jsonify(paginate(history, limit, ('start', 'id')))
 
 @app.route('/api/sessions/<int:session_id>', methods=['DELETE'])
+@transactional
 def delete_session(session_id):
     conn = get_db_connection()
     cursor = conn.cursor()
+    session = conn.execute('SELECT task_id FROM study_session WHERE id = ?', (session_id,)).fetchone()
+    task_id = session['task_id'] if session else None
+    footprint_before = get_task_footprint(conn, task_id)
     
-    # Deleta a sessão
+    # Deleta a sessão e aplica a variação na evolução
     cursor.execute('DELETE FROM study_session WHERE id = ?', (session_id,))
-    conn.commit()
-    
-    # Recalcula evolução após excluir a sessão
-    recalculate_evolution(conn)
+    apply_task_delta(conn, footprint_before, get_task_footprint(conn, task_id))
+    touch_tables(conn, 'study_session')
+    run_after_commit(conn, goal_evaluator.schedule)
     
     return jsonify({"message": "Sessão excluída com sucesso"})
 
 @app.route('/api/results', methods=['POST'])
+@transactional
 def add_result():
     data = request.get_json()
     conn = get_db_connection()
     percent = (data['correct'] / data['total']) * 100 if data['total'] > 0 else 0
     cursor = conn.cursor()
+    footprint_before = get_task_footprint(conn, data.get('task_id'))
     
     # Inserir resultado
     cursor.execute('INSERT INTO result (task_id, correct, total, percent, created_at) VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)',
                    (data.get('task_id'), data['correct'], data['total'], percent))
+    result_id = cursor.lastrowid
     
     # Buscar informações da tarefa
     task_info = conn.execute("""
@@ -410,34 +984,17 @@ def add_result():
         
         # Notificações baseadas no desempenho
         if percent >= 80:
-            create_performance_notification(
-                conn,
-                f"Excelente resultado em {task_dict['discipline_name']}! 🌟",
-                f"Você acertou {percent:.1f}% dos exercícios em {task_dict['title']}.",
-                'normal',
-                task_dict['discipline_id'],
-                'discipline'
-            )
+            emit_notification(conn, 'result_high', task_dict['discipline_id'], scope=result_id, percent=percent, **task_dict)
         elif percent < 60:
-            create_performance_notification(
-                conn,
-                f"Atenção ao resultado em {task_dict['discipline_name']}",
-                f"Você acertou {percent:.1f}% dos exercícios em {task_dict['title']}. Considere revisar o conteúdo.",
-                'high',
-                task_dict['discipline_id'],
-                'discipline'
-            )
+            emit_notification(conn, 'result_low', task_dict['discipline_id'], scope=result_id, percent=percent, **task_dict)
         
         # Se houve uma melhoria significativa na média
         if recent_avg and recent_avg < 60 and percent >= 80:
-            create_achievement_notification(
-                conn,
-                "Melhoria significativa! 📈",
-                f"Seu desempenho em {task_dict['discipline_name']} melhorou muito! Continue assim!"
-            )
+            emit_notification(conn, 'performance_improved', scope=result_id, **task_dict)
     
-    conn.commit()
-    recalculate_evolution(conn)
+    apply_task_delta(conn, footprint_before, get_task_footprint(conn, data.get('task_id')))
+    touch_tables(conn, 'result')
+    run_after_commit(conn, goal_evaluator.schedule)
     check_performance_alerts(conn)
     
     return jsonify({"message": "Resultado salvo", "percent": percent})
@@ -447,7 +1004,9 @@ def get_reviews():
     date_from = request.args.get('from')
     date_to = request.args.get('to')
     conn = get_db_connection()
-    query = "SELECT r.*, d.name as discipline_name, t.title as task_title FROM review r LEFT JOIN task t ON r.task_id = t.id LEFT JOIN discipline d ON t.discipline_id = d.id"
+    columns, _ = select_list({**table_fields('review', 'r'), 'discipline_name': 'd.name', 'task_title': 't.title'},
+                             "r.*, d.name as discipline_name, t.title as task_title")
+    query = f"SELECT {columns} FROM review r LEFT JOIN task t ON r.task_id = t.id LEFT JOIN discipline d ON t.discipline_id = d.id"
     params = []
     conditions = []
     if date_from:
@@ -459,26 +1018,73 @@ def get_reviews():
     if conditions:
         query += " WHERE " + " AND ".join(conditions)
     query += " ORDER BY r.scheduled_for"
-    reviews = conn.execute(query, params).fetchall()
-    return jsonify([dict(row) for row in reviews])
+    return stream_rows(conn.execute(query, params))
 
 @app.route('/api/evolution', methods=['GET'])
+@cached_response('evolution', 'discipline')
 def get_evolution():
     conn = get_db_connection()
-    data = conn.execute("SELECT d.name as discipline_name, e.* FROM evolution e JOIN discipline d ON e.discipline_id = d.id").fetchall()
-    return jsonify([dict(row) for row in data])
+    columns, _ = select_list({'discipline_name': 'd.name', **table_fields('evolution', 'e')}, "d.name as discipline_name, e.*")
+    return stream_rows(conn.execute(f"SELECT {columns} FROM evolution e JOIN discipline d ON e.discipline_id = d.id"))
+
+@app.route('/api/evolution/rebuild', methods=['POST'])
+@transactional
+def rebuild_evolution():
+    conn = get_db_connection()
+    recalculate_evolution(conn)
+    return jsonify({"message": "Evolução reconstruída com sucesso"})
+
+@app.route('/api/evolution/consistency', methods=['GET'])
+def check_evolution_consistency():
+    conn = get_db_connection()
+    differences = verify_evolution_consistency(conn)
+    return jsonify({"consistent": not differences, "differences": differences})
+
+@app.route('/api/metrics/db', methods=['GET'])
+def get_db_metrics():
+    return jsonify({**db_pool.metrics(), "storage_profile": storage_profile_name})
+
+@app.route('/api/metrics/cache', methods=['GET'])
+def get_cache_metrics():
+    return jsonify(response_cache.metrics())
 
 @app.route('/api/notifications', methods=['GET'])
 def get_notifications():
+    """
+    Notificações paginadas por cursor (created_at, id), das mais recentes
+    para as mais antigas. Por padrão só as não lidas (unread=0 inclui as lidas);
+    filtros opcionais: type, priority e discipline_id.
+    """
     conn = get_db_connection()
-    notifications = conn.execute("""
+    conditions, params = [], []
+    if request.args.get('unread', '1') != '0':
+        conditions.append("read_at IS NULL")
+    for column in ('type', 'priority'):
+        if request.args.get(column):
+            conditions.append(f"{column} = ?")
+            params.append(request.args[column])
+    discipline_id = request.args.get('discipline_id', type=int)
+    if discipline_id:
+        conditions.append("related_type = 'discipline' AND related_id = ?")
+        params.append(discipline_id)
+    try:
+        after = decode_cursor(request.args.get('cursor'))
+    except ValueError:
+        return jsonify({"error": "Cursor inválido"}), 400
+    if after:
+        conditions.append("(created_at, id) < (?, ?)")
+        params.extend(after)
+    limit = page_size_arg()
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    notifications = conn.execute(f"""
         SELECT * FROM notification
-        WHERE read_at IS NULL
-        ORDER BY created_at DESC
-    """).fetchall()
-    return jsonify([dict(row) for row in notifications])
+        {where}
+        ORDER BY created_at DESC, id DESC LIMIT ?
+    """, params + [limit + 1]).fetchall()
+    return jsonify(paginate(notifications, limit, ('created_at', 'id')))
 
 @app.route('/api/notifications/mark-read', methods=['POST'])
+@transactional
 def mark_notifications_read():
     conn = get_db_connection()
     data = request.get_json()
@@ -490,31 +1096,95 @@ def mark_notifications_read():
             f"UPDATE notification SET read_at = CURRENT_TIMESTAMP WHERE id IN ({placeholders})",
             notification_ids
         )
-        conn.commit()
-    
+    if notification_ids:
+        run_after_commit(conn, lambda: notification_bus.publish('read', {'ids': notification_ids}))
     return jsonify({"message": "Notificações marcadas como lidas"})
 
+@app.route('/api/notifications/stream', methods=['GET'])
+def stream_notifications():
+    """
+    Server-Sent Events com as notificações novas. O id de cada evento é o id
+    da notificação: ao reconectar, o navegador envia Last-Event-ID e recebe o
+    que perdeu. Na primeira conexão, ?last_id= indica o último id já carregado.
+    """
+    last_id = request.headers.get('Last-Event-ID') or request.args.get('last_id')
+    try: last_id = int(last_id) if last_id else None
+    except ValueError: last_id = None
+    # Inscreve antes de consultar para não perder nada entre a consulta e o stream
+    subscription = notification_bus.subscribe()
+    backlog = []
+    if last_id is not None:
+        backlog = [dict(row) for row in get_db_connection().execute("""
+            SELECT * FROM notification WHERE id > ? AND read_at IS NULL ORDER BY id LIMIT ?
+        """, (last_id, NOTIFICATION_STREAM_BACKLOG))]
+
+    def events():
+        sent_id = last_id or 0
+        try:
+            yield "retry: 1000\n\n"
+            for row in backlog:
+                sent_id = row['id']
+                yield f"id: {sent_id}\nevent: notification\ndata: {json.dumps(row)}\n\n"
+            # Se o cliente ficar para trás, a inscrição é encerrada e ele reconecta com Last-Event-ID
+            while not (subscription.overflowed or subscription.closed):
+                try:
+                    event, data = subscription.get(timeout=15)
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+                    continue
+                if event is None:
+                    break
+                if event == 'notification':
+                    if data['id'] <= sent_id: continue
+                    sent_id = data['id']
+                    yield f"id: {sent_id}\nevent: notification\ndata: {json.dumps(data)}\n\n"
+                else:
+                    yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+        finally:
+            notification_bus.unsubscribe(subscription)
+
+    return Response(events(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 @app.route('/api/topics/performance', methods=['GET'])
+@cached_response('topic_performance', 'topic', 'discipline')
 def get_topics_performance():
+    """
+    Desempenho por tópico lido da tabela topic_performance. Com ?days=N
+    (ex.: 7, 30, 90) os números vêm dos agregados diários dos últimos N dias.
+    """
     conn = get_db_connection()
-    # Busca performance por tópico
-    topics_data = conn.execute("""
+    days = request.args.get('days', type=int)
+    if days is not None and days <= 0:
+        return jsonify({"error": "days deve ser positivo"}), 400
+    if days:
+        aggregates = """
+            LEFT JOIN (
+                SELECT topic_id, SUM(results) as results, SUM(correct) as correct,
+                       SUM(total) as total, SUM(percent_sum) as percent_sum
+                FROM topic_performance_daily
+                WHERE day >= date('now', ?)
+                GROUP BY topic_id
+            ) agg ON agg.topic_id = t.id"""
+        params = (f'-{days} days',)
+    else:
+        aggregates = "LEFT JOIN topic_performance agg ON agg.topic_id = t.id"
+        params = ()
+    topics_data = conn.execute(f"""
         WITH TopicResults AS (
             SELECT 
                 t.id as topic_id,
                 t.name as topic_name,
                 t.discipline_id,
                 d.name as discipline_name,
-                SUM(r.correct) as total_correct,
-                SUM(r.total) as total_questions,
-                COUNT(DISTINCT tt.task_id) as total_tasks,
-                ROUND(AVG(r.percent), 2) as avg_performance
+                agg.correct as total_correct,
+                agg.total as total_questions,
+                tp.tasks as total_tasks,
+                ROUND(agg.percent_sum / NULLIF(agg.results, 0), 2) as avg_performance
             FROM topic t
             JOIN discipline d ON t.discipline_id = d.id
-            LEFT JOIN task_topics tt ON t.id = tt.topic_id
-            LEFT JOIN task tk ON tt.task_id = tk.id
-            LEFT JOIN result r ON tk.id = r.task_id
-            GROUP BY t.id, t.name, t.discipline_id, d.name
+            LEFT JOIN topic_performance tp ON tp.topic_id = t.id
+            {aggregates}
         )
         SELECT 
             *,
@@ -524,10 +1194,10 @@ def get_topics_performance():
                 ELSE 'weak'
             END as performance_level
         FROM TopicResults
-        ORDER BY discipline_name, avg_performance DESC
-    """).fetchall()
+        ORDER BY discipline_name, COALESCE(avg_performance, 0) DESC, topic_id
+    """, params).fetchall()
 
-    # Organizar dados por disciplina
+    # Organizar dados por disciplina (as linhas já vêm ordenadas)
     disciplines_map = {}
     for topic in topics_data:
         topic_dict = dict(topic)
@@ -535,11 +1205,11 @@ def get_topics_performance():
         
         if discipline_id not in disciplines_map:
             disciplines_map[discipline_id] = {
-                'name': topic_dict['discipline_name'],
+                'discipline_id': discipline_id,
+                'discipline_name': topic_dict['discipline_name'],
                 'topics': []
             }
         
-        # Adicionar tópico à disciplina
         disciplines_map[discipline_id]['topics'].append({
             'id': topic_dict['topic_id'],
             'name': topic_dict['topic_name'],
@@ -550,19 +1220,129 @@ def get_topics_performance():
             'performanceLevel': topic_dict['performance_level']
         })
     
-    # Converter para lista
-    result = [
-        {
-            'discipline_id': k,
-            'discipline_name': v['name'],
-            'topics': sorted(v['topics'], key=lambda x: x['avgPerformance'], reverse=True)
-        }
-        for k, v in disciplines_map.items()
-    ]
-    
-    return jsonify(result)
+    return jsonify(list(disciplines_map.values()))
+
+# --- Progresso das Metas ---
+def evaluate_goals_progress(conn, goals):
+    """
+    Calcula current_value e progress_percent de várias metas de uma vez,
+    com uma única consulta sobre daily_stats (dias inteiros do início ao
+    fim de cada meta), qualquer que seja o número de metas.
+    """
+    goals = [dict(goal) for goal in goals]
+    if not goals:
+        return []
+    totals = {row['id']: row for row in conn.execute("""
+        WITH goal_range AS (
+            SELECT id, discipline_id, date(start_date) as start_day, date(end_date) as end_day
+            FROM study_goal
+            WHERE id IN (SELECT value FROM json_each(?))
+        )
+        SELECT gr.id, SUM(ds.study_minutes) as study_minutes, SUM(ds.questions) as total_exercises,
+               SUM(ds.percent_sum) / NULLIF(SUM(ds.graded), 0) as avg_performance
+        FROM goal_range gr
+        JOIN daily_stats ds ON ds.discipline_id = gr.discipline_id
+            AND ds.day >= gr.start_day AND ds.day <= gr.end_day
+        GROUP BY gr.id
+    """, (json.dumps([goal['id'] for goal in goals]),))}
+
+    for goal in goals:
+        total = totals.get(goal['id'])
+        if goal['type'] == 'study_time':
+            current_value = (total['study_minutes'] if total else None) or 0
+        elif goal['type'] == 'performance':
+            current_value = (total['avg_performance'] if total else None) or 0
+        elif goal['type'] == 'exercises_completed':
+            current_value = (total['total_exercises'] if total else None) or 0
+        else:
+            current_value = 0
+        goal['current_value'] = current_value
+        goal['progress_percent'] = (current_value / goal['target_value']) * 100
+    return goals
+
+def store_goal_progress(conn, goal_ids=None):
+    """
+    Recalcula as metas ativas (ou só goal_ids) e grava o snapshot em
+    goal_progress. Não faz commit. Retorna as metas avaliadas.
+    """
+    query = """
+        SELECT g.*, d.name as discipline_name
+        FROM study_goal g
+        JOIN discipline d ON g.discipline_id = d.id
+        WHERE g.status = 'active'"""
+    params = ()
+    if goal_ids is not None:
+        query += " AND g.id IN (SELECT value FROM json_each(?))"
+        params = (json.dumps(list(goal_ids)),)
+    goals = evaluate_goals_progress(conn, conn.execute(query, params).fetchall())
+    conn.executemany("""
+        INSERT INTO goal_progress (goal_id, current_value, progress_percent, evaluated_at)
+        VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+        ON CONFLICT(goal_id) DO UPDATE SET current_value = excluded.current_value,
+            progress_percent = excluded.progress_percent, evaluated_at = excluded.evaluated_at
+    """, [(goal['id'], goal['current_value'], goal['progress_percent']) for goal in goals])
+    return goals
+
+def evaluate_goal_states(conn):
+    """Atualiza os snapshots e conclui (com notificação) as metas que atingiram 100%."""
+    goals = store_goal_progress(conn)
+    for goal_dict in goals:
+        if goal_dict['progress_percent'] < 100:
+            continue
+        # A condição em status evita notificar duas vezes a mesma conclusão
+        completed = conn.execute("UPDATE study_goal SET status = 'completed' WHERE id = ? AND status = 'active'",
+                                 (goal_dict['id'],)).rowcount
+        if completed:
+            emit_notification(conn, 'goal_completed', goal_dict['id'], **goal_dict)
+    return goals
+
+class GoalEvaluator:
+    """
+    Avaliação das metas em segundo plano (write-behind). As gravações chamam
+    schedule(); pedidos próximos são agrupados em uma única avaliação, que
+    também roda periodicamente a cada 'interval' segundos.
+    """
+    def __init__(self, delay=0.5, interval=300):
+        self._delay = delay
+        self._interval = interval
+        self._pending = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        self.runs = 0
+        self.last_run_at = None
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="goal-evaluator", daemon=True)
+                self._thread.start()
+
+    def schedule(self):
+        self.start()
+        self._pending.set()
+
+    def run_once(self):
+        with app.app_context():
+            try:
+                with unit_of_work(get_db_connection()) as conn:
+                    evaluate_goal_states(conn)
+            except Exception:
+                traceback.print_exc()
+        with self._lock:
+            self.runs += 1
+            self.last_run_at = datetime.now().isoformat(timespec='seconds')
+
+    def _run(self):
+        while True:
+            if self._pending.wait(self._interval):
+                time.sleep(self._delay)  # agrupa gravações em sequência
+            self._pending.clear()
+            self.run_once()
+
+goal_evaluator = GoalEvaluator()
 
 @app.route('/api/goals', methods=['GET', 'POST'])
+@transactional
 def handle_goals():
     conn = get_db_connection()
     if request.method == 'GET':
@@ -598,8 +1378,7 @@ def handle_goals():
             start_date.isoformat(),  # Usa apenas a data, sem informação de hora
             end_date.isoformat()     # Usa apenas a data, sem informação de hora
         ))
-        conn.commit()
-        
+        store_goal_progress(conn, [cursor.lastrowid])
         new_goal = conn.execute("""
             SELECT g.*, d.name as discipline_name 
             FROM study_goal g 
@@ -610,6 +1389,7 @@ def handle_goals():
         return jsonify(dict(new_goal)), 201
 
 @app.route('/api/goals/<int:goal_id>', methods=['PUT', 'DELETE'])
+@transactional
 def handle_goal(goal_id):
     conn = get_db_connection()
     if request.method == 'PUT':
@@ -642,8 +1422,7 @@ def handle_goal(goal_id):
                 goal_id
             ))
         
-        conn.commit()
-        
+        store_goal_progress(conn, [goal_id])
         updated_goal = conn.execute("""
             SELECT g.*, d.name as discipline_name 
             FROM study_goal g 
@@ -654,10 +1433,10 @@ def handle_goal(goal_id):
     
     if request.method == 'DELETE':
         conn.execute('DELETE FROM study_goal WHERE id = ?', (goal_id,))
-        conn.commit()
         return jsonify({"message": "Meta removida com sucesso"})
 
 @app.route('/api/notifications/check', methods=['POST'])
+@transactional
 def check_for_notifications():
     """Endpoint para forçar uma verificação de notificações"""
     check_notifications()
@@ -665,88 +1444,41 @@ def check_for_notifications():
 
 @app.route('/api/goals/progress', methods=['GET'])
 def get_goals_progress():
+    """
+    Somente leitura: serve o último snapshot de goal_progress. A conclusão das
+    metas fica com o avaliador em segundo plano (goal_evaluator).
+    """
     conn = get_db_connection()
     goals = conn.execute("""
-        SELECT g.*, d.name as discipline_name 
+        SELECT g.*, d.name as discipline_name,
+               gp.current_value, gp.progress_percent, gp.evaluated_at
         FROM study_goal g 
         JOIN discipline d ON g.discipline_id = d.id
+        LEFT JOIN goal_progress gp ON gp.goal_id = g.id
         WHERE g.status = 'active'
     """).fetchall()
     
-    progress_data = []
-    for goal in goals:
-        goal_dict = dict(goal)
-        
-        if goal['type'] == 'study_time':
-            # Calcula progresso do tempo de estudo
-            progress = conn.execute("""
-                SELECT COALESCE(SUM(duration_minutes), 0) as total_minutes
-                FROM study_session s
-                JOIN task t ON s.task_id = t.id
-                WHERE t.discipline_id = ?
-                AND date(s.start) >= ?
-                AND date(s.start) <= ?
-            """, (goal['discipline_id'], goal['start_date'], goal['end_date'])).fetchone()
-            
-            goal_dict['current_value'] = progress['total_minutes']
-            
-        elif goal['type'] == 'performance':
-            # Calcula média de desempenho
-            progress = conn.execute("""
-                SELECT AVG(r.percent) as avg_performance
-                FROM result r
-                JOIN task t ON r.task_id = t.id
-                WHERE t.discipline_id = ?
-                AND date(r.created_at) >= ?
-                AND date(r.created_at) <= ?
-            """, (goal['discipline_id'], goal['start_date'], goal['end_date'])).fetchone()
-            
-            goal_dict['current_value'] = progress['avg_performance'] or 0
-            
-        elif goal['type'] == 'exercises_completed':
-            # Calcula total de exercícios
-            progress = conn.execute("""
-                SELECT COALESCE(SUM(r.total), 0) as total_exercises
-                FROM result r
-                JOIN task t ON r.task_id = t.id
-                WHERE t.discipline_id = ?
-                AND date(r.created_at) >= ?
-                AND date(r.created_at) <= ?
-            """, (goal['discipline_id'], goal['start_date'], goal['end_date'])).fetchone()
-            
-            goal_dict['current_value'] = progress['total_exercises']
-        
-        goal_dict['progress_percent'] = (goal_dict['current_value'] / goal['target_value']) * 100
-        
-        # Se a meta foi alcançada, atualiza o status
-        if goal_dict['progress_percent'] >= 100 and goal_dict['status'] == 'active':
-            conn.execute("UPDATE study_goal SET status = 'completed' WHERE id = ?", (goal_dict['id'],))
-            conn.commit()
-            
-            # Criar notificação de conquista
-            create_goal_notification(
-                conn,
-                f"Meta alcançada em {goal_dict['discipline_name']}! 🎉",
-                f"Você alcançou a meta de {goal_dict['target_value']} {goal_dict['type']}!",
-                'normal',
-                goal_dict['id']
-            )
-        
-        progress_data.append(goal_dict)
+    progress_data = [dict(goal) for goal in goals]
+    # Metas ainda sem snapshot são calculadas na hora, sem gravar nada
+    missing = [goal for goal in progress_data if goal['evaluated_at'] is None]
+    if missing:
+        evaluated = {goal['id']: goal for goal in evaluate_goals_progress(conn, missing)}
+        progress_data = [evaluated.get(goal['id'], goal) for goal in progress_data]
     
     return jsonify(progress_data)
 
 @app.route('/api/performance/history', methods=['GET'])
+@cached_response('performance_history', 'discipline')
 def get_performance_history():
     conn = get_db_connection()
     days = request.args.get('days', default=30, type=int)
     discipline_id = request.args.get('discipline_id', type=int)
     
-    query = """
-        SELECT 
-            d.name as discipline_name,
-            ph.*,
-            ROUND(CAST(ph.correct_answers AS FLOAT) / NULLIF(ph.exercises_completed, 0) * 100, 2) as accuracy
+    accuracy = "ROUND(CAST(ph.correct_answers AS FLOAT) / NULLIF(ph.exercises_completed, 0) * 100, 2)"
+    columns, _ = select_list({'discipline_name': 'd.name', **table_fields('performance_history', 'ph'), 'accuracy': accuracy},
+                             f"d.name as discipline_name, ph.*, {accuracy} as accuracy")
+    query = f"""
+        SELECT {columns}
         FROM performance_history ph
         JOIN discipline d ON ph.discipline_id = d.id
         WHERE ph.date >= date('now', ?)
@@ -759,8 +1491,7 @@ def get_performance_history():
     
     query += " ORDER BY ph.date"
     
-    data = conn.execute(query, params).fetchall()
-    return jsonify([dict(row) for row in data])
+    return stream_rows(conn.execute(query, params))
 
 def validate_course_data(data):
     """Valida a estrutura do JSON de cursos"""
@@ -783,76 +1514,125 @@ def validate_course_data(data):
         if not isinstance(course['name'], str) or not isinstance(course['url'], str):
             raise ValueError("JSON inválido: 'name' e 'url' devem ser strings")
 
-@app.route('/api/courses', methods=['GET'])
-def get_courses():
-    try:
-        # Se estiver rodando como executável, procura em múltiplos locais possíveis
-        possible_paths = []
-        
-        if getattr(sys, 'frozen', False):
-            executable_dir = os.path.dirname(sys.executable)
-            possible_paths.extend([
-                os.path.join(executable_dir, 'course_links.json'),
-                os.path.join(executable_dir, 'resources', 'course_links.json'),
-                os.path.join(sys._MEIPASS, 'course_links.json')
-            ])
-        else:
-            # Em desenvolvimento
-            possible_paths.append(os.path.join(base_path, 'course_links.json'))
+# --- Catálogo de Cursos ---
+COURSES_FALLBACK = {
+    "courses": [
+        {
+            "name": "PORTUGUÊS",
+            "url": "https://www.estrategiaconcursos.com.br/app/dashboard/cursos/"
+        }
+    ]
+}
+
+def resolve_course_links_file():
+    """Primeiro course_links.json existente entre os locais possíveis (None se nenhum)."""
+    if getattr(sys, 'frozen', False):
+        # Executável: ao lado do .exe, em resources/ ou empacotado no _MEIPASS
+        possible_paths = [
+            os.path.join(executable_dir, 'course_links.json'),
+            os.path.join(executable_dir, 'resources', 'course_links.json'),
+            os.path.join(sys._MEIPASS, 'course_links.json'),
+        ]
+    else:
+        possible_paths = [os.path.join(base_path, 'course_links.json')]
+    for json_path in possible_paths:
+        if os.path.exists(json_path):
+            return json_path
+    print(f"course_links.json não encontrado em: {possible_paths}")
+    return None
+
+class CourseCatalog:
+    """
+    Documento de cursos já validado e serializado, com ETag. O arquivo só é
+    relido quando o mtime (ou o tamanho) muda; se a nova versão for inválida,
+    continua servindo a última válida (ou o fallback).
+    """
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._stamp = None
+        self._entry = None
+
+    def _stat(self):
+        try:
+            stat = os.stat(self.path)
+            return (stat.st_mtime_ns, stat.st_size)
+        except (OSError, TypeError):
+            return None
 
-        # Tenta cada caminho possível
-        for json_path in possible_paths:
-            print(f"Tentando ler arquivo de: {json_path}")
-            if os.path.exists(json_path):
+    def get(self):
+        """Retorna {'body', 'etag'} do documento atual."""
+        stamp = self._stat()
+        with self._lock:
+            if self._entry is not None and stamp == self._stamp:
+                return self._entry
+            data = None
+            if stamp is not None:
                 try:
-                    with open(json_path, encoding='utf-8') as f:
+                    with open(self.path, encoding='utf-8') as f:
                         data = json.load(f)
-                        # Valida a estrutura do JSON
-                        validate_course_data(data)
-                        return jsonify(data)
-                except json.JSONDecodeError as e:
-                    print(f"Erro ao decodificar JSON em {json_path}: {e}")
-                    continue
-                except Exception as e:
-                    print(f"Erro ao processar {json_path}: {e}")
-                    continue
+                    validate_course_data(data)
+                except (OSError, ValueError) as e:  # JSONDecodeError é um ValueError
+                    print(f"Erro ao processar {self.path}: {e}")
+                    data = None
+            if data is not None or self._entry is None:
+                if data is None:
+                    print("Usando dados fallback devido a falha na leitura do arquivo")
+                body = app.json.dumps(data if data is not None else COURSES_FALLBACK).encode('utf-8')
+                self._entry = {'body': body, 'etag': hashlib.sha1(body).hexdigest()}
+            self._stamp = stamp
+            return self._entry
 
-        # Se chegou aqui, não conseguiu ler de nenhum local
-        # Tenta usar um fallback com dados básicos
-        fallback_data = {
-            "courses": [
-                {
-                    "name": "PORTUGUÊS",
-                    "url": "https://www.estrategiaconcursos.com.br/app/dashboard/cursos/"
-                }
-            ]
-        }
-        print("Usando dados fallback devido a falha na leitura do arquivo")
-        return jsonify(fallback_data)
+course_catalog = CourseCatalog(resolve_course_links_file())
 
-    except Exception as e:
-        print(f"Erro crítico ao processar courses: {str(e)}")
-        return jsonify({
-            "error": "Erro ao carregar cursos",
-            "details": str(e)
-        }), 500
+@app.route('/api/courses', methods=['GET'])
+def get_courses():
+    entry = course_catalog.get()
+    return conditional_response(entry['body'], entry['etag'], encoded=entry.setdefault('encoded', {}))
 
 @app.route('/api/sync', methods=['POST'])
 def sync_from_spreadsheet():
-    try:
-        conn = get_db_connection()
-        print(f"Tentando importar do arquivo: {excel_file}")
-        
-        if not os.path.exists(excel_file):
-            return jsonify({"error": f"Arquivo não encontrado em: {excel_file}"}), 404
-        import_disciplines_from_excel(conn)
-        import_ciclo_from_excel(conn)
-        recalculate_evolution(conn)
-        return jsonify({"message": "Sincronização concluída!"})
-    except Exception as e:
-        import traceback
-        traceback.print_exc()
-        return jsonify({"error": str(e)}), 500
+    print(f"Tentando importar do arquivo: {excel_file}")
+    if not os.path.exists(excel_file):
+        return jsonify({"error": f"Arquivo não encontrado em: {excel_file}"}), 404
+    # mode=full reaplica todas as linhas; o padrão aplica só o que mudou
+    job, started = start_sync_job(full=request.args.get('mode') == 'full')
+    if not started:
+        return jsonify({"error": "Já existe uma sincronização em andamento", "job": job.to_dict()}), 409
+    return jsonify({"message": "Sincronização iniciada", "job": job.to_dict()}), 202
+
+@app.route('/api/sync/jobs/<job_id>', methods=['GET'])
+def get_sync_job(job_id):
+    job = sync_jobs.get(job_id)
+    if not job: return jsonify({"error": "Sincronização não encontrada"}), 404
+    return jsonify(job.to_dict())
+
+@app.route('/api/sync/jobs/<job_id>/events', methods=['GET'])
+def stream_sync_job(job_id):
+    """Server-Sent Events com o andamento da sincronização até ela terminar."""
+    job = sync_jobs.get(job_id)
+    if not job: return jsonify({"error": "Sincronização não encontrada"}), 404
+
+    def events():
+        version = -1
+        while True:
+            version, state = job.wait_for_change(version, timeout=15)
+            if state is None:
+                yield ": keep-alive\n\n"
+                continue
+            yield f"event: progress\ndata: {json.dumps(state)}\n\n"
+            if state['status'] in SyncJob.FINISHED:
+                return
+
+    return Response(events(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/api/sync/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_sync_job(job_id):
+    job = sync_jobs.get(job_id)
+    if not job: return jsonify({"error": "Sincronização não encontrada"}), 404
+    job.cancel_requested.set()
+    return jsonify(job.to_dict()), 202
 
 # --- Funções Auxiliares ---
 
@@ -932,7 +1712,138 @@ def create_tables(conn):
     )""")
     conn.commit()
 
+# --- Migrações de Schema ---
+# Lista ordenada de migrações (versão, descrição, comandos SQL ou funções que
+# recebem a conexão, sem fazer commit). Cada migração
+# roda uma única vez, dentro de uma transação, e fica registrada em
+# schema_version. Novas alterações de schema devem entrar no fim da lista.
+MIGRATIONS = [
+    (1, "Uma linha por (disciplina, dia) em performance_history", [
+        """DELETE FROM performance_history WHERE id NOT IN (
+            SELECT MAX(id) FROM performance_history GROUP BY discipline_id, date)""",
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_performance_history_discipline_date ON performance_history (discipline_id, date)",
+    ]),
+    (2, "Índices das consultas principais", [
+        "CREATE INDEX IF NOT EXISTS idx_task_trilha_status ON task (trilha_id, status)",
+        "CREATE INDEX IF NOT EXISTS idx_task_discipline ON task (discipline_id)",
+        "CREATE INDEX IF NOT EXISTS idx_task_status ON task (status, completion_date)",
+        "CREATE INDEX IF NOT EXISTS idx_task_topics_topic ON task_topics (topic_id)",
+        "CREATE INDEX IF NOT EXISTS idx_topic_discipline ON topic (discipline_id, name)",
+        "CREATE INDEX IF NOT EXISTS idx_study_session_task ON study_session (task_id)",
+        "CREATE INDEX IF NOT EXISTS idx_study_session_start ON study_session (start)",
+        "CREATE INDEX IF NOT EXISTS idx_result_task ON result (task_id)",
+        "CREATE INDEX IF NOT EXISTS idx_result_created_at ON result (created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_notification_related ON notification (type, related_id)",
+        "CREATE INDEX IF NOT EXISTS idx_notification_unread ON notification (read_at, created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_review_scheduled_for ON review (scheduled_for)",
+        "CREATE INDEX IF NOT EXISTS idx_performance_history_date ON performance_history (date)",
+        "CREATE INDEX IF NOT EXISTS idx_evolution_discipline ON evolution (discipline_id)",
+        "CREATE INDEX IF NOT EXISTS idx_study_goal_status ON study_goal (status, end_date)",
+    ]),
+    (3, "Controle de alterações da sincronização com a planilha", [
+        """CREATE TABLE IF NOT EXISTS sheet_row_state (
+            spreadsheet_task_id REAL PRIMARY KEY,
+            fingerprint TEXT NOT NULL,
+            synced_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            removed_at DATETIME
+        )""",
+        "ALTER TABLE result ADD COLUMN source TEXT",
+    ]),
+    # A sincronização deixou de reconstruir a evolução a cada execução; um
+    # rebuild único remove linhas antigas que o cálculo anterior deixava para trás
+    (4, "Rebuild único das tabelas de evolução", [
+        lambda conn: rebuild_evolution_tables(conn),
+    ]),
+    (5, "Snapshots de progresso das metas", [
+        """CREATE TABLE IF NOT EXISTS goal_progress (
+            goal_id INTEGER PRIMARY KEY,
+            current_value REAL NOT NULL,
+            progress_percent REAL NOT NULL,
+            evaluated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (goal_id) REFERENCES study_goal (id) ON DELETE CASCADE
+        )""",
+        # O snapshot inicial é gravado na migração 9: o progresso é lido de daily_stats
+    ]),
+    (6, "Chave de deduplicação das notificações", [
+        "ALTER TABLE notification ADD COLUMN dedup_key TEXT",
+        lambda conn: backfill_notification_keys(conn),
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_notification_dedup_key ON notification (dedup_key)",
+    ]),
+    (7, "Índices da paginação por cursor", [
+        "CREATE INDEX IF NOT EXISTS idx_notification_created_at ON notification (created_at)",
+        # Mesma expressão da ordenação do histórico de sessões (start pode ser NULL)
+        "CREATE INDEX IF NOT EXISTS idx_study_session_start_key ON study_session (COALESCE(start, ''))",
+    ]),
+    (8, "Agregados de desempenho por tópico", [
+        """CREATE TABLE IF NOT EXISTS topic_performance (
+            topic_id INTEGER PRIMARY KEY,
+            tasks INTEGER NOT NULL DEFAULT 0,
+            results INTEGER NOT NULL DEFAULT 0,
+            correct INTEGER NOT NULL DEFAULT 0,
+            total INTEGER NOT NULL DEFAULT 0,
+            percent_sum REAL NOT NULL DEFAULT 0,
+            FOREIGN KEY (topic_id) REFERENCES topic (id) ON DELETE CASCADE
+        )""",
+        # Chave (dia, tópico): a janela ?days=N é um intervalo no início da chave
+        """CREATE TABLE IF NOT EXISTS topic_performance_daily (
+            day DATE NOT NULL,
+            topic_id INTEGER NOT NULL,
+            results INTEGER NOT NULL DEFAULT 0,
+            correct INTEGER NOT NULL DEFAULT 0,
+            total INTEGER NOT NULL DEFAULT 0,
+            percent_sum REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, topic_id),
+            FOREIGN KEY (topic_id) REFERENCES topic (id) ON DELETE CASCADE
+        )""",
+        lambda conn: rebuild_topic_performance(conn),
+    ]),
+    # Chave (dia, disciplina): janelas de datas e rollups semanais/mensais são
+    # intervalos no início da chave
+    (9, "Tabela de fatos diária por disciplina", [
+        """CREATE TABLE IF NOT EXISTS daily_stats (
+            day DATE NOT NULL,
+            discipline_id INTEGER NOT NULL,
+            study_minutes INTEGER NOT NULL DEFAULT 0,
+            sessions INTEGER NOT NULL DEFAULT 0,
+            results INTEGER NOT NULL DEFAULT 0,
+            graded INTEGER NOT NULL DEFAULT 0,
+            questions INTEGER NOT NULL DEFAULT 0,
+            correct INTEGER NOT NULL DEFAULT 0,
+            percent_sum REAL NOT NULL DEFAULT 0,
+            tasks_completed INTEGER NOT NULL DEFAULT 0,
+            task_minutes INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, discipline_id),
+            FOREIGN KEY (discipline_id) REFERENCES discipline (id) ON DELETE CASCADE
+        )""",
+        lambda conn: rebuild_daily_stats(conn),
+        lambda conn: store_goal_progress(conn),
+    ]),
+]
+
+def run_migrations(conn):
+    """Aplica, em ordem, as migrações ainda não registradas em schema_version."""
+    conn.execute("""CREATE TABLE IF NOT EXISTS schema_version (
+        version INTEGER PRIMARY KEY,
+        description TEXT NOT NULL,
+        applied_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    )""")
+    current = conn.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version").fetchone()[0]
+    for version, description, statements in MIGRATIONS:
+        if version <= current: continue
+        try:
+            conn.execute("BEGIN")
+            for statement in statements:
+                if callable(statement): statement(conn)
+                else: conn.execute(statement)
+            conn.execute("INSERT INTO schema_version (version, description) VALUES (?, ?)", (version, description))
+            conn.commit()
+            print(f"Migração {version} aplicada: {description}")
+        except sqlite3.Error:
+            conn.rollback()
+            raise
+
 def convert_time_to_minutes(time_obj):
+    import pandas as pd
     if pd.isna(time_obj): return 0
     if isinstance(time_obj, str):
         try:
@@ -941,153 +1852,1012 @@ def convert_time_to_minutes(time_obj):
     elif hasattr(time_obj, 'hour'): return time_obj.hour * 60 + time_obj.minute
     return 0
 
-def import_disciplines_from_excel(conn):
-    df = pd.read_excel(excel_file, sheet_name='CICLO', header=2, usecols=['DISCIPLINA'])
+# Colunas da aba CICLO usadas na importação; as demais nem são carregadas
+CICLO_COLUMNS = ['TRILHA', 'DATA', 'TAREFA', 'DISCIPLINA', 'CH', 'CH (EFETIVA)', 'TAREFAS', 'TOTAL QUESTÕES', 'TOTAL ACERTOS']
+
+_ciclo_cache = {'key': None, 'digest': None, 'frame': None}
+_ciclo_cache_lock = threading.Lock()
+
+def load_ciclo_sheet():
+    """
+    Lê a aba CICLO uma única vez por sincronização. O DataFrame fica em cache
+    enquanto o arquivo não mudar: (mtime, tamanho) iguais reaproveitam o cache
+    direto; se mudarem mas o hash SHA-256 do conteúdo for o mesmo, também.
+    """
+    import pandas as pd
+    stat = os.stat(excel_file)
+    key = (stat.st_mtime_ns, stat.st_size)
+    with _ciclo_cache_lock:
+        if _ciclo_cache['key'] == key:
+            return _ciclo_cache['frame']
+        with open(excel_file, 'rb') as f:
+            content = f.read()
+        digest = hashlib.sha256(content).hexdigest()
+        if _ciclo_cache['digest'] == digest:
+            _ciclo_cache['key'] = key
+            return _ciclo_cache['frame']
+        # O leitor openpyxl do pandas abre a planilha em modo read-only
+        df = pd.read_excel(io.BytesIO(content), sheet_name='CICLO', header=2,
+                           usecols=lambda column: str(column).strip() in CICLO_COLUMNS)
+        df.columns = [c.strip() for c in df.columns]
+        _ciclo_cache.update(key=key, digest=digest, frame=df)
+        return df
+
+def import_disciplines_from_excel(conn, df=None):
+    if df is None: df = load_ciclo_sheet()
     disciplinas = df['DISCIPLINA'].dropna().unique()
     cursor = conn.cursor()
-    for d in disciplinas: cursor.execute("INSERT OR IGNORE INTO discipline (name) VALUES (?)", (d,))
-    conn.commit()
+    cursor.executemany("INSERT OR IGNORE INTO discipline (name) VALUES (?)", [(d,) for d in disciplinas])
+    touch_tables(conn, 'discipline')
+
+def import_ciclo_from_excel(conn, df=None, full=False, progress=None):
+    if df is None: df = load_ciclo_sheet()
+    return import_ciclo_frame(conn, df, full=full, progress=progress)
+
+def time_column_to_minutes(series):
+    """Aplica convert_time_to_minutes só aos valores distintos da coluna (nulos viram 0)."""
+    import pandas as pd
+    import numpy as np
+    codes, uniques = pd.factorize(series)
+    minutes = np.array([convert_time_to_minutes(value) for value in uniques] + [0], dtype='int64')
+    return pd.Series(minutes[codes], index=series.index)
 
-def import_ciclo_from_excel(conn):
-    df = pd.read_excel(excel_file, sheet_name='CICLO', header=2)
+def prepare_ciclo_frame(df):
+    """
+    Limpeza vetorizada da aba CICLO: converte TAREFA, DATA e as colunas de
+    carga horária de uma vez e descarta linhas sem número de tarefa.
+    """
+    import pandas as pd
+    import numpy as np
+    df = df.copy()
     df.columns = [c.strip() for c in df.columns]
-    cursor = conn.cursor()
-    added = 0
-    for i, row in df.iterrows():
-        task_id_raw = row.get('TAREFA')
-        if pd.isna(task_id_raw): continue
-        try: task_id_sheet = float(task_id_raw)
-        except: continue
-        task_date_str = row.get('DATA')
-        status = 'Pendente'
-        completion_date = None
-        if pd.notna(task_date_str):
-            status = 'Concluída'
-            completion_date = pd.to_datetime(task_date_str, errors='coerce').strftime('%Y-%m-%d')
-        trilha_name = row.get('TRILHA'); trilha_id = None
-        if pd.notna(trilha_name):
-            cursor.execute("INSERT OR IGNORE INTO trilha (name) VALUES (?)", (str(trilha_name),))
-            trilha_id = cursor.execute("SELECT id FROM trilha WHERE name = ?", (str(trilha_name),)).fetchone()[0]
-        disc_name = row.get('DISCIPLINA'); disc_id = None
-        if pd.notna(disc_name):
-            disc_id_res = cursor.execute("SELECT id FROM discipline WHERE name = ?", (disc_name,)).fetchone()
-            if not disc_id_res: continue
-            disc_id = disc_id_res[0]
-        else: continue
-        ch_efetiva_min = convert_time_to_minutes(row.get('CH (EFETIVA)'))
-        cursor.execute("""INSERT OR IGNORE INTO task (spreadsheet_task_id, title, discipline_id, trilha_id, completion_date, 
-                          carga_horaria_planejada_minutos, carga_horaria_realizada_minutos, status)
-                          VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
-                       (task_id_sheet, row.get('TAREFAS'), disc_id, trilha_id, completion_date, 
-                        convert_time_to_minutes(row.get('CH')), ch_efetiva_min, status))
-        if cursor.rowcount > 0:
-            added += 1
-            task_id_db = cursor.lastrowid
-            q_total, q_correct = row.get('TOTAL QUESTÕES', 0), row.get('TOTAL ACERTOS', 0)
-            if pd.notna(q_total) and q_total > 0:
-                percent = (q_correct / q_total) * 100 if q_total > 0 else 0
-                cursor.execute("INSERT INTO result (task_id, correct, total, percent, created_at) VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)",
-                               (task_id_db, q_correct, q_total, percent))
-    conn.commit()
-    print(f"{added} novas tarefas adicionadas.")
+    for column in ('TAREFA', 'DATA', 'TRILHA', 'DISCIPLINA', 'TAREFAS', 'CH', 'CH (EFETIVA)'):
+        if column not in df.columns: df[column] = None
+    for column in ('TOTAL QUESTÕES', 'TOTAL ACERTOS'):
+        if column not in df.columns: df[column] = 0
+    df['spreadsheet_task_id'] = pd.to_numeric(df['TAREFA'], errors='coerce')
+    df = df[df['spreadsheet_task_id'].notna()]
+    completion = pd.to_datetime(df['DATA'], errors='coerce')
+    df = df.assign(
+        status=np.where(df['DATA'].notna(), 'Concluída', 'Pendente'),
+        completion_date=completion.dt.strftime('%Y-%m-%d').astype(object).where(completion.notna(), None),
+        trilha_name=df['TRILHA'].astype(object).where(df['TRILHA'].notna(), None).map(lambda v: None if v is None else str(v)),
+        title=df['TAREFAS'].astype(object).where(df['TAREFAS'].notna(), None),
+        ch_minutes=time_column_to_minutes(df['CH']),
+        ch_efetiva_minutes=time_column_to_minutes(df['CH (EFETIVA)']),
+        q_total=pd.to_numeric(df['TOTAL QUESTÕES'], errors='coerce'),
+        q_correct=pd.to_numeric(df['TOTAL ACERTOS'], errors='coerce'),
+    )
+    return df
 
-def recalculate_evolution(conn):
-    print("Iniciando recálculo da tabela de evolução...")
-    
-    # Query para resultados diários
-    daily_results_query = """
-        SELECT 
-            t.discipline_id,
-            d.name as discipline_name,
-            date(r.created_at) as date,
-            SUM(r.total) as exercises_completed,
-            SUM(r.correct) as correct_answers
-        FROM task t 
-        JOIN discipline d ON t.discipline_id = d.id 
-        JOIN result r ON t.id = r.task_id
-        GROUP BY t.discipline_id, date(r.created_at)
+def _column_values(series):
+    """Valores de uma coluna como objetos Python, com nulos convertidos para None."""
+    return series.astype(object).where(series.notna(), None).tolist()
+
+# Acima deste número de tarefas alteradas numa sincronização, um rebuild
+# completo da evolução é mais barato que aplicar as variações uma a uma
+INCREMENTAL_SYNC_LIMIT = 200
+IMPORT_CHUNK_SIZE = 1000
+
+FINGERPRINT_COLUMNS = ['trilha_name', 'DISCIPLINA', 'title', 'completion_date', 'status',
+                       'ch_minutes', 'ch_efetiva_minutes', 'q_total', 'q_correct']
+
+def ciclo_row_fingerprints(df):
+    """Impressão digital (hash estável) de cada linha da CICLO, usada para detectar alterações."""
+    import pandas as pd
+    frame = df[FINGERPRINT_COLUMNS].astype(object)
+    frame = frame.where(frame.notna(), None)
+    return pd.util.hash_pandas_object(frame, index=False).astype(str)
+
+def _task_params(frame):
+    return zip(_column_values(frame['title']),
+               frame['discipline_id'].astype(int).tolist(),
+               _column_values(frame['trilha_id']),
+               _column_values(frame['completion_date']),
+               frame['ch_minutes'].astype(int).tolist(),
+               frame['ch_efetiva_minutes'].astype(int).tolist(),
+               frame['status'].tolist(),
+               frame['spreadsheet_task_id'].astype(float).tolist())
+
+def _insert_sheet_results(cursor, frame, task_ids, created_at=None):
+    """Grava o resultado (TOTAL QUESTÕES/ACERTOS) das linhas que o possuem, marcado como vindo da planilha."""
+    frame = frame[frame['q_total'].notna() & (frame['q_total'] > 0)]
+    if frame.empty: return
+    created_at = created_at or {}
+    # NaN é gravado como NULL pelo SQLite
+    cursor.executemany("""INSERT INTO result (task_id, correct, total, percent, created_at, source)
+                          VALUES (?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP), 'sheet')""",
+                       [(task_ids[sid], correct, total, correct / total * 100, created_at.get(task_ids[sid]))
+                        for sid, correct, total in zip(frame['spreadsheet_task_id'].tolist(),
+                                                       frame['q_correct'].astype(float).tolist(),
+                                                       frame['q_total'].astype(float).tolist())])
+
+def import_ciclo_frame(conn, df, full=False, update_evolution=True, progress=None):
     """
-    
-    # Query para tempo de estudo diário
-    daily_study_query = """
-        SELECT 
-            t.discipline_id,
-            date(s.start) as date,
-            SUM(s.duration_minutes) as study_time_minutes
-        FROM task t 
-        JOIN study_session s ON t.id = s.task_id
-        GROUP BY t.discipline_id, date(s.start)
+    Sincroniza a aba CICLO (já lida em um DataFrame) com o banco, aplicando só
+    a diferença em relação à última sincronização, numa única transação:
+    - linhas novas viram tarefas (e resultados, se houver questões);
+    - linhas cuja impressão digital mudou atualizam a tarefa e o resultado da planilha;
+    - linhas removidas da planilha removem a tarefa correspondente, se ela não
+      tiver dados registrados no app (sessões, resultados fora da planilha,
+      tópicos); senão a tarefa fica e a linha é marcada como removida ('removed').
+    Tarefas importadas antes do controle de alterações são apenas registradas
+    ('adopted') na primeira vez, sem sobrescrever edições feitas no app; as que
+    divergem da planilha são listadas em adopted_changed_ids.
+    Com full=True todas as linhas são reaplicadas. Retorna o resumo das alterações.
+    progress(fase, linhas_processadas, total) é chamado ao longo da importação
+    e pode lançar SyncCancelled para abortar (a transação é desfeita pelo chamador).
     """
-    
-    # Carregar dados
-    df_daily_results = pd.read_sql_query(daily_results_query, conn)
-    df_daily_study = pd.read_sql_query(daily_study_query, conn)
-    
-    # Mesclar dados de resultados e tempo de estudo
-    if not df_daily_results.empty:
-        # Processar dados diários
-        for _, row in df_daily_results.iterrows():
-            # Buscar tempo de estudo correspondente
-            study_time = 0
-            if not df_daily_study.empty:
-                matching_study = df_daily_study[
-                    (df_daily_study['discipline_id'] == row['discipline_id']) &
-                    (df_daily_study['date'] == row['date'])
-                ]
-                if not matching_study.empty:
-                    study_time = matching_study.iloc[0]['study_time_minutes']
-            
-            # Calcular performance
-            performance = (row['correct_answers'] / row['exercises_completed'] * 100) if row['exercises_completed'] > 0 else 0
-            
-            # Inserir ou atualizar histórico
-            conn.execute("""
-                INSERT OR REPLACE INTO performance_history 
-                (discipline_id, date, exercises_completed, correct_answers, study_time_minutes, performance_percent)
-                VALUES (?, ?, ?, ?, ?, ?)
-            """, (
-                row['discipline_id'],
-                row['date'],
-                row['exercises_completed'],
-                row['correct_answers'],
-                study_time,
-                performance
-            ))
-    
-    # Continuar com o cálculo normal de evolução
-    tasks_results_query = "SELECT t.discipline_id, d.name as discipline_name, r.total, r.correct FROM task t JOIN discipline d ON t.discipline_id = d.id LEFT JOIN result r ON t.id = r.task_id"
-    df_tasks = pd.read_sql_query(tasks_results_query, conn)
-    study_time_query = """
-        SELECT discipline_id, SUM(total_minutes) as total_minutos_estudados
-        FROM (
-            SELECT discipline_id, carga_horaria_realizada_minutos as total_minutes FROM task WHERE carga_horaria_realizada_minutos IS NOT NULL
-            UNION ALL
-            SELECT t.discipline_id, s.duration_minutes as total_minutes FROM study_session s JOIN task t ON s.task_id = t.id WHERE s.duration_minutes IS NOT NULL
-        )
-        GROUP BY discipline_id
+    import pandas as pd
+    report = progress or (lambda phase, rows_processed=None, rows_total=None: None)
+    df = prepare_ciclo_frame(df)
+    sheet_ids = set(df['spreadsheet_task_id'].tolist())
+    cursor = conn.cursor()
+
+    trilha_names = df['trilha_name'].dropna().unique().tolist()
+    cursor.executemany("INSERT OR IGNORE INTO trilha (name) VALUES (?)", [(name,) for name in trilha_names])
+    trilha_ids = {name: id_ for id_, name in cursor.execute("SELECT id, name FROM trilha")}
+    discipline_ids = {name: id_ for id_, name in cursor.execute("SELECT id, name FROM discipline")}
+
+    # Linhas de disciplinas desconhecidas são ignoradas, como antes
+    df = df.assign(discipline_id=df['DISCIPLINA'].map(discipline_ids))
+    df = df[df['discipline_id'].notna()].drop_duplicates(subset='spreadsheet_task_id', keep='first')
+    df = df.assign(trilha_id=df['trilha_name'].map(trilha_ids).astype('Int64'),
+                   fingerprint=ciclo_row_fingerprints(df))
+
+    previous, removed = {}, set()
+    for sid, fingerprint, removed_at in cursor.execute("SELECT spreadsheet_task_id, fingerprint, removed_at FROM sheet_row_state"):
+        previous[sid] = fingerprint
+        if removed_at is not None: removed.add(sid)
+    existing = dict(cursor.execute("SELECT spreadsheet_task_id, id FROM task WHERE spreadsheet_task_id IS NOT NULL"))
+    previous_fingerprint = df['spreadsheet_task_id'].map(previous)
+    in_db = df['spreadsheet_task_id'].isin(existing.keys())
+    tracked = previous_fingerprint.notna()
+
+    inserted = df[~in_db]
+    if full:
+        updated, adopted = df[in_db], df.iloc[0:0]
+    else:
+        updated = df[in_db & tracked & (previous_fingerprint != df['fingerprint'])]
+        adopted = df[in_db & ~tracked]
+    gone_ids = [sid for sid in previous if sid not in sheet_ids and sid in existing and sid not in removed]
+    # Apagar a tarefa levaria junto (ON DELETE CASCADE) o que foi registrado no app
+    with_app_data = {row[0] for row in cursor.execute("""
+        SELECT t.spreadsheet_task_id FROM task t
+        WHERE t.spreadsheet_task_id IN (SELECT value FROM json_each(?))
+          AND (EXISTS (SELECT 1 FROM study_session s WHERE s.task_id = t.id)
+               OR EXISTS (SELECT 1 FROM result r WHERE r.task_id = t.id AND r.source IS NOT 'sheet')
+               OR EXISTS (SELECT 1 FROM task_topics tt WHERE tt.task_id = t.id))
+    """, (json.dumps(gone_ids),))} if gone_ids else set()
+    deleted_ids = [sid for sid in gone_ids if sid not in with_app_data]
+    removed_ids = [sid for sid in gone_ids if sid in with_app_data]
+
+    changed_count = len(inserted) + len(updated) + len(deleted_ids)
+    incremental = update_evolution and changed_count <= INCREMENTAL_SYNC_LIMIT
+    touched_task_ids = [existing[sid] for sid in updated['spreadsheet_task_id'].tolist() + deleted_ids]
+    footprints_before = {task_id: get_task_footprint(conn, task_id) for task_id in touched_task_ids} if incremental else {}
+
+    rows_total = len(inserted) + len(updated) + len(adopted) + len(gone_ids)
+    report('importing', 0, rows_total)
+
+    # Inserções, em blocos para permitir acompanhar o progresso
+    task_params = list(_task_params(inserted))
+    for start in range(0, len(task_params), IMPORT_CHUNK_SIZE):
+        cursor.executemany("""INSERT OR IGNORE INTO task (title, discipline_id, trilha_id, completion_date, 
+                              carga_horaria_planejada_minutos, carga_horaria_realizada_minutos, status, spreadsheet_task_id)
+                              VALUES (?, ?, ?, ?, ?, ?, ?, ?)""", task_params[start:start + IMPORT_CHUNK_SIZE])
+        report('importing', min(start + IMPORT_CHUNK_SIZE, len(task_params)), rows_total)
+    if not inserted.empty:
+        new_ids = dict(cursor.execute(
+            "SELECT spreadsheet_task_id, id FROM task WHERE spreadsheet_task_id IN (SELECT value FROM json_each(?))",
+            (json.dumps(inserted['spreadsheet_task_id'].tolist()),)
+        ).fetchall())
+        existing.update(new_ids)
+        _insert_sheet_results(cursor, inserted, existing)
+
+    # Atualizações: a tarefa recebe os valores da planilha e o resultado vindo
+    # da planilha é substituído, preservando a data original
+    if not updated.empty:
+        cursor.executemany("""UPDATE task SET title = ?, discipline_id = ?, trilha_id = ?, completion_date = ?,
+                              carga_horaria_planejada_minutos = ?, carga_horaria_realizada_minutos = ?, status = ?
+                              WHERE spreadsheet_task_id = ?""", _task_params(updated))
+        updated_task_ids = [existing[sid] for sid in updated['spreadsheet_task_id'].tolist()]
+        created_at = {row['task_id']: row['created_at'] for row in cursor.execute(
+            "SELECT task_id, MIN(created_at) as created_at FROM result WHERE source = 'sheet' AND task_id IN (SELECT value FROM json_each(?)) GROUP BY task_id",
+            (json.dumps(updated_task_ids),))}
+        cursor.execute("DELETE FROM result WHERE source = 'sheet' AND task_id IN (SELECT value FROM json_each(?))",
+                       (json.dumps(updated_task_ids),))
+        _insert_sheet_results(cursor, updated, existing, created_at)
+    report('importing', len(inserted) + len(updated), rows_total)
+
+    # Tarefas importadas antes do controle de alterações: marca o resultado
+    # equivalente ao da planilha para que futuras alterações o substituam e
+    # lista as que divergem da planilha (tarefa ou resultado), sem alterá-las
+    adopted_changed_ids = []
+    if not adopted.empty:
+        adopted_task_ids = json.dumps(adopted['spreadsheet_task_id'].tolist())
+        stored = {row[-1]: tuple(row[:-1]) for row in cursor.execute("""
+            SELECT title, discipline_id, trilha_id, completion_date, carga_horaria_planejada_minutos,
+                   carga_horaria_realizada_minutos, status, spreadsheet_task_id
+            FROM task WHERE spreadsheet_task_id IN (SELECT value FROM json_each(?))""", (adopted_task_ids,))}
+        adopted_results = adopted[adopted['q_total'].notna() & (adopted['q_total'] > 0)]
+        cursor.executemany("""UPDATE result SET source = 'sheet' WHERE id = (
+                                  SELECT id FROM result WHERE task_id = ? AND correct = ? AND total = ? AND source IS NULL
+                                  ORDER BY id LIMIT 1)""",
+                           zip(adopted_results['spreadsheet_task_id'].map(existing).tolist(),
+                               adopted_results['q_correct'].astype(float).tolist(),
+                               adopted_results['q_total'].astype(float).tolist()))
+        matched = {row[0] for row in cursor.execute("""
+            SELECT DISTINCT t.spreadsheet_task_id FROM task t JOIN result r ON r.task_id = t.id AND r.source = 'sheet'
+            WHERE t.spreadsheet_task_id IN (SELECT value FROM json_each(?))""", (adopted_task_ids,))}
+        unmatched = set(adopted_results['spreadsheet_task_id'].tolist()) - matched
+        adopted_changed_ids = [params[-1] for params in _task_params(adopted)
+                               if stored.get(params[-1]) != params[:-1] or params[-1] in unmatched]
+
+    report('importing', len(inserted) + len(updated) + len(adopted), rows_total)
+
+    # Remoções
+    if deleted_ids:
+        cursor.execute("DELETE FROM task WHERE spreadsheet_task_id IN (SELECT value FROM json_each(?))", (json.dumps(deleted_ids),))
+        cursor.execute("DELETE FROM sheet_row_state WHERE spreadsheet_task_id IN (SELECT value FROM json_each(?))", (json.dumps(deleted_ids),))
+    if removed_ids:
+        cursor.execute("UPDATE sheet_row_state SET removed_at = CURRENT_TIMESTAMP WHERE spreadsheet_task_id IN (SELECT value FROM json_each(?))",
+                       (json.dumps(removed_ids),))
+    # Linhas marcadas como removidas que voltaram à planilha
+    restored_ids = [sid for sid in removed if sid in sheet_ids]
+    if restored_ids:
+        cursor.execute("UPDATE sheet_row_state SET removed_at = NULL WHERE spreadsheet_task_id IN (SELECT value FROM json_each(?))",
+                       (json.dumps(restored_ids),))
+
+    recorded = pd.concat([inserted, updated, adopted])
+    cursor.executemany("INSERT OR REPLACE INTO sheet_row_state (spreadsheet_task_id, fingerprint, synced_at) VALUES (?, ?, CURRENT_TIMESTAMP)",
+                       zip(recorded['spreadsheet_task_id'].astype(float).tolist(), recorded['fingerprint'].tolist()))
+
+    touch_tables(conn, 'trilha', 'task', 'task_topics', 'study_session', 'result')
+    report('evolution', rows_total, rows_total)
+    if incremental:
+        for task_id in [existing[sid] for sid in inserted['spreadsheet_task_id'].tolist()]:
+            apply_task_delta(conn, None, get_task_footprint(conn, task_id))
+        for task_id, before in footprints_before.items():
+            apply_task_delta(conn, before, get_task_footprint(conn, task_id))
+    if update_evolution and not incremental:
+        recalculate_evolution(conn)
+
+    changeset = {
+        "inserted": len(inserted),
+        "updated": len(updated),
+        "deleted": len(deleted_ids),
+        "removed": len(removed_ids),
+        "adopted": len(adopted),
+        "unchanged": len(df) - len(inserted) - len(updated) - len(adopted),
+        # Listas limitadas para não inflar a resposta (ex.: mode=full)
+        "updated_ids": updated['spreadsheet_task_id'].tolist()[:100],
+        "deleted_ids": deleted_ids[:100],
+        "removed_ids": removed_ids[:100],
+        "adopted_changed_ids": adopted_changed_ids[:100],
+        "evolution": "incremental" if incremental else ("rebuild" if update_evolution else "skipped"),
+    }
+    print(f"Sincronização CICLO: {changeset['inserted']} novas, {changeset['updated']} alteradas, "
+          f"{changeset['deleted']} removidas, {changeset['removed']} mantidas com dados do app, "
+          f"{changeset['unchanged']} sem alteração.")
+    return changeset
+
+def compute_evolution_snapshot(conn):
     """
-    df_study_time = pd.read_sql_query(study_time_query, conn)
-    if df_tasks.empty:
+    Calcula, a partir dos dados brutos, o conteúdo esperado das tabelas
+    performance_history, evolution e daily_stats, sem gravar nada.
+    Retorna (linhas_historico, linhas_evolucao, linhas_diarias) como listas de tuplas.
+
+    Os dados brutos são percorridos uma única vez, pela agregação por
+    (dia, disciplina) de DAILY_STATS_SQL; o histórico é um filtro desses
+    agregados e a evolução, um groupby deles por disciplina.
+    """
+    import pandas as pd
+    import numpy as np
+    daily = pd.read_sql_query(DAILY_STATS_SQL, conn)
+    # Tarefas sem resultado também contam uma linha em qtd_tarefas
+    tasks = pd.read_sql_query("""
+        SELECT t.discipline_id, SUM(NOT EXISTS (SELECT 1 FROM result r WHERE r.task_id = t.id)) as tasks_without_results
+        FROM task t
+        JOIN discipline d ON t.discipline_id = d.id
+        GROUP BY t.discipline_id
+    """, conn)
+    percent = lambda correct, total: np.where(total > 0, correct / total.where(total > 0) * 100, 0).astype(float)
+
+    # Sessões e resultados sem data entram na evolução, mas não nas tabelas por dia
+    dated = daily[daily['day'].notna()]
+    daily_rows = list(zip(*(dated[column].tolist() for column in ('day', 'discipline_id', *DAILY_STATS_COLUMNS))))
+
+    history = dated[dated['results'] > 0]
+    history_rows = list(zip(
+        history['discipline_id'].tolist(),
+        history['day'].tolist(),
+        history['questions'].tolist(),
+        history['correct'].tolist(),
+        history['study_minutes'].tolist(),
+        percent(history['correct'], history['questions']).tolist(),
+    ))
+
+    evo_data = tasks.set_index('discipline_id').join(daily.groupby('discipline_id')[list(DAILY_STATS_COLUMNS)].sum()).fillna(0)
+    evolution_rows = list(zip(
+        evo_data.index.tolist(),
+        (evo_data['tasks_without_results'] + evo_data['results']).astype(int).tolist(),
+        evo_data['questions'].astype(int).tolist(),
+        evo_data['correct'].astype(int).tolist(),
+        percent(evo_data['correct'], evo_data['questions']).tolist(),
+        (evo_data['study_minutes'] + evo_data['task_minutes']).astype(int).tolist(),
+    ))
+    return history_rows, evolution_rows, daily_rows
+
+def recalculate_evolution(conn):
+    """Reconstrução completa (rebuild) de daily_stats, performance_history, evolution e topic_performance. Não faz commit."""
+    print("Iniciando recálculo da tabela de evolução...")
+    snapshot = compute_evolution_snapshot(conn)
+    rebuild_daily_stats(conn, snapshot)
+    evolution_rows = rebuild_evolution_tables(conn, snapshot)
+    rebuild_topic_performance(conn)
+    touch_tables(conn, 'evolution', 'daily_stats', 'performance_history', 'topic_performance')
+    if not evolution_rows:
         print("Não há dados de tarefas para calcular a evolução.")
-        return
-    df_tasks.fillna(0, inplace=True)
-    evo_data = df_tasks.groupby(['discipline_id', 'discipline_name']).agg(
-        qtd_tarefas=('discipline_id', 'size'), qtd_exercicios_feitos=('total', 'sum'), total_acertos=('correct', 'sum')).reset_index()
-    evo_data['desempenho_medio'] = np.where(evo_data['qtd_exercicios_feitos'] > 0, (evo_data['total_acertos'] / evo_data['qtd_exercicios_feitos']) * 100, 0)
-    if not df_study_time.empty:
-        evo_data = pd.merge(evo_data, df_study_time, on='discipline_id', how='left')
-    else:
-        evo_data['total_minutos_estudados'] = 0
-    evo_data.fillna(0, inplace=True)
+    print("Tabela de evolução atualizada COM SUCESSO.")
+
+def rebuild_evolution_tables(conn, snapshot=None):
+    """Regrava performance_history e evolution a partir dos dados brutos (ou de um snapshot já calculado), sem commit."""
+    history_rows, evolution_rows, _ = snapshot or compute_evolution_snapshot(conn)
     cursor = conn.cursor()
+    cursor.execute("DELETE FROM performance_history")
+    cursor.executemany("""
+        INSERT INTO performance_history 
+        (discipline_id, date, exercises_completed, correct_answers, study_time_minutes, performance_percent)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, history_rows)
     cursor.execute("DELETE FROM evolution")
-    for i, row in evo_data.iterrows():
-        cursor.execute("""
+    cursor.executemany("""
         INSERT INTO evolution (discipline_id, qtd_tarefas, qtd_exercicios_feitos, total_acertos, desempenho_medio, total_minutos_estudados)
         VALUES (?, ?, ?, ?, ?, ?)
-        """, (row['discipline_id'], int(row['qtd_tarefas']), int(row['qtd_exercicios_feitos']), int(row['total_acertos']), row['desempenho_medio'], int(row['total_minutos_estudados'])))
-    conn.commit()
-    print("Tabela de evolução atualizada COM SUCESSO.")
+    """, evolution_rows)
+    return evolution_rows
+
+def task_topics_map(conn, where='', params=()):
+    """
+    Tópicos agrupados por tarefa ({task_id: [{'id', 'name'}]}) em uma única
+    consulta. where filtra a tabela task; vazio carrega todas as tarefas.
+    """
+    scope = f"WHERE tt.task_id IN (SELECT id FROM task {where})" if where else ''
+    topics = conn.execute(' '.join(part for part in (
+        "SELECT tt.task_id, t.id, t.name FROM task_topics tt JOIN topic t ON t.id = tt.topic_id",
+        scope, "ORDER BY tt.task_id, tt.topic_id") if part), params)
+    topics_by_task = {}
+    for topic in topics:
+        topics_by_task.setdefault(topic['task_id'], []).append({'id': topic['id'], 'name': topic['name']})
+    return topics_by_task
+
+def attach_task_topics(conn, task_rows, topics_by_task=None):
+    """
+    Converte as linhas de tarefa em dicts com a lista 'topics' preenchida.
+    Sem topics_by_task, busca os tópicos de todas as tarefas em uma única consulta.
+    """
+    tasks_list = [dict(row) for row in task_rows]
+    if not tasks_list: return tasks_list
+    if topics_by_task is None:
+        # json_each permite passar qualquer quantidade de ids em um único parâmetro
+        topics_by_task = task_topics_map(conn, "WHERE id IN (SELECT value FROM json_each(?))",
+                                         (json.dumps([task['id'] for task in tasks_list]),))
+    for task in tasks_list:
+        task['topics'] = topics_by_task.get(task['id'], [])
+    return tasks_list
+
+# --- Motor Incremental de Evolução ---
+# Em vez de reconstruir as tabelas a cada escrita, cada endpoint captura a
+# "pegada" (footprint) da tarefa afetada antes e depois da alteração e aplica
+# somente a diferença em evolution e nas linhas (disciplina, dia) de
+# performance_history que mudaram.
+
+def get_task_footprint(conn, task_id):
+    """
+    Retorna a contribuição de uma tarefa para as tabelas de evolução:
+    disciplina, linhas/exercícios/acertos/minutos para evolution, os
+    agregados por dia usados em performance_history e as linhas de
+    daily_stats. None se a tarefa não existe.
+    """
+    if task_id is None: return None
+    task = conn.execute("""
+        SELECT t.discipline_id, t.carga_horaria_realizada_minutos,
+               date(t.completion_date) as completion_day, t.status = 'Concluída' as completed
+        FROM task t JOIN discipline d ON t.discipline_id = d.id
+        WHERE t.id = ?
+    """, (task_id,)).fetchone()
+    if not task: return None
+    days = {}
+    result_days = {}
+    daily = {}
+    result_count = exercises = correct = 0
+    for row in conn.execute("""
+        SELECT date(created_at) as day, COUNT(*) as n, SUM(total) as total, SUM(correct) as correct,
+               COUNT(percent) as graded, SUM(percent) as percent_sum
+        FROM result WHERE task_id = ? GROUP BY date(created_at)
+    """, (task_id,)):
+        result_count += row['n']
+        exercises += row['total'] or 0
+        correct += row['correct'] or 0
+        days[row['day']] = (row['n'], row['total'], row['correct'], None)
+        result_days[row['day']] = (row['graded'], row['correct'] or 0, row['total'] or 0, row['percent_sum'] or 0)
+        _add_daily(daily, row['day'], results=row['n'], graded=row['graded'], questions=row['total'] or 0,
+                   correct=row['correct'] or 0, percent_sum=row['percent_sum'] or 0)
+    session_minutes = 0
+    for row in conn.execute("""
+        SELECT date(start) as day, SUM(duration_minutes) as minutes, COUNT(*) as n
+        FROM study_session WHERE task_id = ? GROUP BY date(start)
+    """, (task_id,)):
+        session_minutes += row['minutes'] or 0
+        n, total, corr, _ = days.get(row['day'], (0, None, None, None))
+        days[row['day']] = (n, total, corr, row['minutes'])
+        _add_daily(daily, row['day'], study_minutes=row['minutes'] or 0, sessions=row['n'])
+    # A conclusão e a carga realizada da tarefa contam no dia da conclusão
+    _add_daily(daily, task['completion_day'], tasks_completed=task['completed'] or 0,
+               task_minutes=task['carga_horaria_realizada_minutos'] or 0)
+    return {
+        'discipline_id': task['discipline_id'],
+        'rows': max(1, result_count),
+        'exercises': exercises,
+        'correct': correct,
+        'minutes': (task['carga_horaria_realizada_minutos'] or 0) + session_minutes,
+        'days': days,
+        # Para topic_performance: tópicos da tarefa e resultados por dia
+        'topics': [row[0] for row in conn.execute("SELECT topic_id FROM task_topics WHERE task_id = ? ORDER BY topic_id", (task_id,))],
+        'result_days': result_days,
+        # Para daily_stats: {dia: valores na ordem de DAILY_STATS_COLUMNS}
+        'daily': {day: tuple(values) for day, values in daily.items()},
+    }
+
+# Colunas somáveis de daily_stats, na ordem usada pelas pegadas e pelo rebuild
+DAILY_STATS_COLUMNS = ('study_minutes', 'sessions', 'results', 'graded', 'questions', 'correct',
+                       'percent_sum', 'tasks_completed', 'task_minutes')
+
+def _add_daily(daily, day, **values):
+    """Acumula valores na linha 'day' de uma pegada diária; dias nulos (sem data) são ignorados."""
+    if day is None or not any(values.values()): return
+    row = daily.setdefault(day, [0] * len(DAILY_STATS_COLUMNS))
+    for name, value in values.items():
+        row[DAILY_STATS_COLUMNS.index(name)] += value
+
+def _apply_evolution_delta(conn, discipline_id, rows, exercises, correct, minutes):
+    if not (rows or exercises or correct or minutes): return
+    cursor = conn.execute("""
+        UPDATE evolution SET qtd_tarefas = qtd_tarefas + ?, qtd_exercicios_feitos = qtd_exercicios_feitos + ?,
+            total_acertos = total_acertos + ?, total_minutos_estudados = total_minutos_estudados + ?
+        WHERE discipline_id = ?
+    """, (rows, exercises, correct, minutes, discipline_id))
+    if cursor.rowcount == 0:
+        conn.execute("""
+            INSERT INTO evolution (discipline_id, qtd_tarefas, qtd_exercicios_feitos, total_acertos, desempenho_medio, total_minutos_estudados)
+            VALUES (?, ?, ?, ?, 0, ?)
+        """, (discipline_id, rows, exercises, correct, minutes))
+    conn.execute("DELETE FROM evolution WHERE discipline_id = ? AND qtd_tarefas <= 0", (discipline_id,))
+    conn.execute("""
+        UPDATE evolution SET desempenho_medio = CASE WHEN qtd_exercicios_feitos > 0
+            THEN (CAST(total_acertos AS REAL) / qtd_exercicios_feitos) * 100 ELSE 0 END
+        WHERE discipline_id = ?
+    """, (discipline_id,))
+
+def refresh_performance_day(conn, discipline_id, day):
+    """
+    Recalcula apenas a linha (disciplina, dia) de performance_history, a
+    partir da linha já atualizada de daily_stats.
+    """
+    stats = conn.execute("""
+        SELECT results, questions, correct, study_minutes FROM daily_stats WHERE day = ? AND discipline_id = ?
+    """, (day, discipline_id)).fetchone()
+    if not stats or stats['results'] <= 0:
+        conn.execute("DELETE FROM performance_history WHERE discipline_id = ? AND date = ?", (discipline_id, day))
+        return
+    exercises, correct, study_time = stats['questions'], stats['correct'], stats['study_minutes']
+    performance = (correct / exercises * 100) if exercises and exercises > 0 else 0
+    conn.execute("""
+        INSERT OR REPLACE INTO performance_history 
+        (discipline_id, date, exercises_completed, correct_answers, study_time_minutes, performance_percent)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, (discipline_id, day, exercises, correct, study_time, float(performance)))
+
+def apply_task_delta(conn, before, after):
+    """
+    Aplica em evolution, daily_stats, performance_history e topic_performance
+    a diferença entre duas pegadas de uma mesma tarefa (None representa
+    tarefa inexistente). Não faz commit.
+    """
+    if before != after:
+        touch_tables(conn, 'evolution', 'daily_stats', 'performance_history', 'topic_performance')
+    if before:
+        _apply_evolution_delta(conn, before['discipline_id'], -before['rows'], -before['exercises'],
+                               -before['correct'], -before['minutes'])
+    if after:
+        _apply_evolution_delta(conn, after['discipline_id'], after['rows'], after['exercises'],
+                               after['correct'], after['minutes'])
+    daily_part = lambda footprint: (footprint['discipline_id'], footprint['daily']) if footprint else None
+    if daily_part(before) != daily_part(after):
+        _apply_daily_delta(conn, before, -1)
+        _apply_daily_delta(conn, after, 1)
+    before_days = {(before['discipline_id'], d): v for d, v in before['days'].items()} if before else {}
+    after_days = {(after['discipline_id'], d): v for d, v in after['days'].items()} if after else {}
+    for key in set(before_days) | set(after_days):
+        if before_days.get(key) != after_days.get(key) and key[1] is not None:
+            refresh_performance_day(conn, *key)
+    topic_part = lambda footprint: (footprint['topics'], footprint['result_days']) if footprint else ([], {})
+    if topic_part(before) != topic_part(after):
+        _apply_topic_delta(conn, before, -1)
+        _apply_topic_delta(conn, after, 1)
+
+def _apply_topic_delta(conn, footprint, sign):
+    """Soma (sign=1) ou subtrai (sign=-1) a contribuição da tarefa em cada um dos seus tópicos."""
+    if not footprint or not footprint['topics']: return
+    totals = [sum(values[i] for values in footprint['result_days'].values()) for i in range(4)]
+    conn.executemany("""
+        INSERT INTO topic_performance (topic_id, tasks, results, correct, total, percent_sum)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT(topic_id) DO UPDATE SET tasks = tasks + excluded.tasks, results = results + excluded.results,
+            correct = correct + excluded.correct, total = total + excluded.total,
+            percent_sum = percent_sum + excluded.percent_sum
+    """, [(topic_id, sign, *(sign * value for value in totals)) for topic_id in footprint['topics']])
+    conn.executemany("""
+        INSERT INTO topic_performance_daily (day, topic_id, results, correct, total, percent_sum)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT(day, topic_id) DO UPDATE SET results = results + excluded.results,
+            correct = correct + excluded.correct, total = total + excluded.total,
+            percent_sum = percent_sum + excluded.percent_sum
+    """, [(day, topic_id, *(sign * value for value in values))
+          for topic_id in footprint['topics']
+          for day, values in footprint['result_days'].items() if day is not None])
+    conn.execute("DELETE FROM topic_performance WHERE tasks <= 0 AND topic_id IN (SELECT value FROM json_each(?))",
+                 (json.dumps(footprint['topics']),))
+    conn.executemany("DELETE FROM topic_performance_daily WHERE day = ? AND topic_id = ? AND results <= 0 AND total <= 0",
+                     [(day, topic_id) for topic_id in footprint['topics'] for day in footprint['result_days'] if day is not None])
+
+def _apply_daily_delta(conn, footprint, sign):
+    """Soma (sign=1) ou subtrai (sign=-1) a contribuição da tarefa nas linhas (dia, disciplina) de daily_stats."""
+    if not footprint or not footprint['daily']: return
+    discipline_id = footprint['discipline_id']
+    columns = ', '.join(DAILY_STATS_COLUMNS)
+    updates = ', '.join(f"{column} = {column} + excluded.{column}" for column in DAILY_STATS_COLUMNS)
+    conn.executemany(f"""
+        INSERT INTO daily_stats (day, discipline_id, {columns})
+        VALUES (?, ?, {', '.join('?' * len(DAILY_STATS_COLUMNS))})
+        ON CONFLICT(day, discipline_id) DO UPDATE SET {updates}
+    """, [(day, discipline_id, *(sign * value for value in values)) for day, values in footprint['daily'].items()])
+    conn.executemany("""
+        DELETE FROM daily_stats WHERE day = ? AND discipline_id = ?
+            AND sessions <= 0 AND results <= 0 AND tasks_completed <= 0 AND task_minutes = 0
+    """, [(day, discipline_id) for day in footprint['daily']])
+
+# daily_stats calculada do zero (rebuild e verificação): sessões, resultados e
+# tarefas concluídas, cada um agregado no seu dia antes de juntar os três.
+# Linhas com dia nulo (registros sem data) são mantidas para a evolução.
+DAILY_STATS_SQL = f"""
+    SELECT f.day, f.discipline_id, {', '.join(f'SUM(f.{column}) as {column}' for column in DAILY_STATS_COLUMNS)}
+    FROM (
+        SELECT date(s.start) as day, t.discipline_id, COALESCE(SUM(s.duration_minutes), 0) as study_minutes,
+               COUNT(*) as sessions, 0 as results, 0 as graded, 0 as questions, 0 as correct, 0 as percent_sum,
+               0 as tasks_completed, 0 as task_minutes
+        FROM study_session s JOIN task t ON t.id = s.task_id
+        GROUP BY 1, 2
+        UNION ALL
+        SELECT date(r.created_at), t.discipline_id, 0, 0, COUNT(*), COUNT(r.percent), COALESCE(SUM(r.total), 0),
+               COALESCE(SUM(r.correct), 0), COALESCE(SUM(r.percent), 0), 0, 0
+        FROM result r JOIN task t ON t.id = r.task_id
+        GROUP BY 1, 2
+        UNION ALL
+        SELECT date(t.completion_date), t.discipline_id, 0, 0, 0, 0, 0, 0, 0,
+               t.status = 'Concluída', COALESCE(t.carga_horaria_realizada_minutos, 0)
+        FROM task t
+        WHERE t.status = 'Concluída' OR COALESCE(t.carga_horaria_realizada_minutos, 0) != 0
+    ) f
+    JOIN discipline d ON d.id = f.discipline_id
+    GROUP BY f.day, f.discipline_id"""
+
+def rebuild_daily_stats(conn, snapshot=None):
+    """Regrava daily_stats a partir dos dados brutos (ou de um snapshot já calculado), sem commit."""
+    conn.execute("DELETE FROM daily_stats")
+    if snapshot is None:
+        conn.execute(f"""INSERT INTO daily_stats (day, discipline_id, {', '.join(DAILY_STATS_COLUMNS)})
+                         SELECT * FROM ({DAILY_STATS_SQL}) WHERE day IS NOT NULL""")
+        return
+    conn.executemany(f"""
+        INSERT INTO daily_stats (day, discipline_id, {', '.join(DAILY_STATS_COLUMNS)})
+        VALUES ({', '.join('?' * (len(DAILY_STATS_COLUMNS) + 2))})
+    """, snapshot[2])
+
+# Agregados de topic_performance calculados do zero (rebuild e verificação)
+TOPIC_PERFORMANCE_SQL = """
+    SELECT tt.topic_id, COUNT(DISTINCT tt.task_id) as tasks, COUNT(r.percent) as results,
+           COALESCE(SUM(r.correct), 0) as correct, COALESCE(SUM(r.total), 0) as total,
+           COALESCE(SUM(r.percent), 0) as percent_sum
+    FROM task_topics tt
+    JOIN task t ON t.id = tt.task_id
+    LEFT JOIN result r ON r.task_id = tt.task_id
+    GROUP BY tt.topic_id"""
+TOPIC_PERFORMANCE_DAILY_SQL = """
+    SELECT date(r.created_at) as day, tt.topic_id, COUNT(r.percent) as results,
+           COALESCE(SUM(r.correct), 0) as correct, COALESCE(SUM(r.total), 0) as total,
+           COALESCE(SUM(r.percent), 0) as percent_sum
+    FROM task_topics tt
+    JOIN task t ON t.id = tt.task_id
+    JOIN result r ON r.task_id = tt.task_id
+    WHERE r.created_at IS NOT NULL
+    GROUP BY date(r.created_at), tt.topic_id
+    HAVING COUNT(r.percent) > 0 OR COALESCE(SUM(r.total), 0) > 0"""
+
+def rebuild_topic_performance(conn):
+    """Regrava topic_performance e topic_performance_daily a partir dos dados brutos, sem commit."""
+    conn.execute("DELETE FROM topic_performance")
+    conn.execute("DELETE FROM topic_performance_daily")
+    conn.execute(f"INSERT INTO topic_performance (topic_id, tasks, results, correct, total, percent_sum) {TOPIC_PERFORMANCE_SQL}")
+    conn.execute(f"INSERT INTO topic_performance_daily (day, topic_id, results, correct, total, percent_sum) {TOPIC_PERFORMANCE_DAILY_SQL}")
+
+def verify_evolution_consistency(conn):
+    """
+    Compara as tabelas mantidas incrementalmente com o resultado de um rebuild
+    completo. Retorna a lista de divergências (vazia quando estão idênticas).
+    """
+    def normalize(rows, key_size):
+        normalized = {}
+        for row in rows:
+            values = tuple(round(v, 6) if isinstance(v, float) else v for v in row)
+            normalized[values[:key_size]] = values[key_size:]
+        return normalized
+
+    history_rows, evolution_rows, daily_rows = compute_evolution_snapshot(conn)
+    topic_rows = [tuple(row) for row in conn.execute(TOPIC_PERFORMANCE_SQL)]
+    topic_daily_rows = [tuple(row) for row in conn.execute(TOPIC_PERFORMANCE_DAILY_SQL)]
+    stored_topics = conn.execute("SELECT topic_id, tasks, results, correct, total, percent_sum FROM topic_performance").fetchall()
+    stored_topic_daily = conn.execute("SELECT day, topic_id, results, correct, total, percent_sum FROM topic_performance_daily").fetchall()
+    stored_daily = conn.execute(f"SELECT day, discipline_id, {', '.join(DAILY_STATS_COLUMNS)} FROM daily_stats").fetchall()
+    stored_history = conn.execute("""
+        SELECT discipline_id, date, exercises_completed, correct_answers, study_time_minutes, performance_percent
+        FROM performance_history
+    """).fetchall()
+    stored_evolution = conn.execute("""
+        SELECT discipline_id, qtd_tarefas, qtd_exercicios_feitos, total_acertos, desempenho_medio, total_minutos_estudados
+        FROM evolution
+    """).fetchall()
+    differences = []
+    for table, expected, stored, key_size in (
+        ('performance_history', history_rows, stored_history, 2),
+        ('evolution', evolution_rows, stored_evolution, 1),
+        ('topic_performance', topic_rows, stored_topics, 1),
+        ('topic_performance_daily', topic_daily_rows, stored_topic_daily, 2),
+        ('daily_stats', daily_rows, stored_daily, 2),
+    ):
+        expected_map = normalize(expected, key_size)
+        stored_map = normalize([tuple(r) for r in stored], key_size)
+        if len(stored) != len(stored_map):
+            differences.append({'table': table, 'key': None, 'expected': None, 'stored': 'linhas duplicadas'})
+        for key in sorted(set(expected_map) | set(stored_map), key=str):
+            if expected_map.get(key) != stored_map.get(key):
+                differences.append({'table': table, 'key': list(key), 'expected': expected_map.get(key), 'stored': stored_map.get(key)})
+    return differences
+
+# --- Sincronização em Segundo Plano ---
+class SyncCancelled(Exception):
+    """Sincronização interrompida a pedido do usuário."""
+
+class SyncJob:
+    """Estado de uma sincronização executada em uma thread separada."""
+    FINISHED = ('completed', 'failed', 'cancelled')
+
+    def __init__(self, full=False):
+        self.id = uuid.uuid4().hex
+        self.full = full
+        self.status = 'queued'
+        self.phase = 'queued'
+        self.rows_processed = 0
+        self.rows_total = None
+        self.changes = None
+        self.error = None
+        self.created_at = datetime.now().isoformat(timespec='seconds')
+        self.finished_at = None
+        self.cancel_requested = threading.Event()
+        self._version = 0
+        self._changed = threading.Condition()
+
+    def to_dict(self):
+        return {
+            "id": self.id, "status": self.status, "phase": self.phase,
+            "rows_processed": self.rows_processed, "rows_total": self.rows_total,
+            "changes": self.changes, "error": self.error,
+            "cancel_requested": self.cancel_requested.is_set(),
+            "created_at": self.created_at, "finished_at": self.finished_at,
+        }
+
+    def update(self, **fields):
+        with self._changed:
+            for name, value in fields.items():
+                setattr(self, name, value)
+            self._version += 1
+            self._changed.notify_all()
+
+    def report(self, phase, rows_processed=None, rows_total=None):
+        """Callback de progresso; também é o ponto onde o cancelamento é atendido."""
+        if self.cancel_requested.is_set():
+            raise SyncCancelled()
+        fields = {'phase': phase}
+        if rows_processed is not None: fields['rows_processed'] = rows_processed
+        if rows_total is not None: fields['rows_total'] = rows_total
+        self.update(**fields)
+
+    def wait_for_change(self, version, timeout):
+        """Espera o estado mudar além de 'version'. Retorna (versão, estado) ou (versão, None) no timeout."""
+        with self._changed:
+            if not self._changed.wait_for(lambda: self._version != version, timeout):
+                return version, None
+            return self._version, self.to_dict()
+
+MAX_FINISHED_SYNC_JOBS = 20
+sync_jobs = {}
+_sync_jobs_lock = threading.Lock()
+
+def start_sync_job(full=False):
+    """
+    Inicia uma sincronização em segundo plano. Só uma roda por vez: se já
+    houver uma ativa, retorna (job_ativo, False).
+    """
+    with _sync_jobs_lock:
+        for job in sync_jobs.values():
+            if job.status not in SyncJob.FINISHED:
+                return job, False
+        finished = [job_id for job_id, job in sync_jobs.items() if job.status in SyncJob.FINISHED]
+        for job_id in finished[:max(0, len(finished) - MAX_FINISHED_SYNC_JOBS + 1)]:
+            del sync_jobs[job_id]
+        job = SyncJob(full=full)
+        sync_jobs[job.id] = job
+    threading.Thread(target=run_sync_job, args=(job,), name=f"sync-{job.id}", daemon=True).start()
+    return job, True
+
+def run_sync_job(job):
+    with app.app_context():
+        try:
+            job.update(status='running')
+            job.report('reading')
+            df = load_ciclo_sheet()  # planilha lida uma vez e compartilhada pelas duas etapas
+            # Disciplinas e tarefas na mesma transação: cancelar desfaz tudo
+            with unit_of_work(get_db_connection()) as conn:
+                job.report('disciplines')
+                import_disciplines_from_excel(conn, df)
+                changes = import_ciclo_from_excel(conn, df, full=job.full, progress=job.report)
+            job.update(status='completed', phase='done', changes=changes)
+            goal_evaluator.schedule()
+        except SyncCancelled:
+            job.update(status='cancelled', phase='cancelled')
+        except Exception as e:
+            traceback.print_exc()
+            job.update(status='failed', error=str(e))
+        finally:
+            job.update(finished_at=datetime.now().isoformat(timespec='seconds'))
+
+# --- Eventos em Tempo Real ---
+class EventSubscription:
+    def __init__(self, max_queue):
+        self._queue = queue.Queue(maxsize=max_queue)
+        self.overflowed = False
+        self.closed = False
+
+    def put(self, item):
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            self.overflowed = True
+
+    def get(self, timeout):
+        return self._queue.get(timeout=timeout)
+
+    def close(self):
+        """Encerra o stream: o consumidor recebe (None, None) e sai do laço."""
+        self.closed = True
+        self.put((None, None))
+
+class EventBus:
+    """
+    Pub/sub em memória (um processo) que alimenta os streams SSE. Cada
+    inscrito tem uma fila limitada; quem não a consome a tempo é descartado.
+    """
+    def __init__(self, max_queue=100):
+        self._max_queue = max_queue
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def subscribe(self):
+        subscription = EventSubscription(self._max_queue)
+        with self._lock:
+            if self._closed:
+                subscription.close()
+            self._subscribers.add(subscription)
+        return subscription
+
+    def close(self):
+        """Encerra todos os streams (no desligamento do servidor)."""
+        with self._lock:
+            self._closed = True
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            subscription.close()
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def publish(self, event, data):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            subscription.put((event, data))
+            if subscription.overflowed:
+                self.unsubscribe(subscription)
+
+    def metrics(self):
+        with self._lock:
+            return {"subscribers": len(self._subscribers)}
+
+NOTIFICATION_STREAM_BACKLOG = 500
+notification_bus = EventBus()
+
+# --- Regras de Notificação ---
+# Cada regra descreve uma notificação. A chave de deduplicação
+# (regra|entidade|escopo|janela) fica em uma coluna com índice único, então
+# reemitir a mesma notificação não cria duplicatas: é só um lookup no índice.
+# 'window' limita a regra a uma notificação por dia/semana; None = uma vez só.
+NOTIFICATION_RULES = {
+    'discipline_hours': {
+        'type': 'achievement', 'priority': 'normal', 'related_type': 'discipline', 'window': None,
+        'title': "{milestone} horas de estudo em {discipline_name}! ⏰",
+        'message': "Você já dedicou {milestone} horas ao estudo desta disciplina. Continue assim!",
+    },
+    'long_session': {
+        'type': 'achievement', 'priority': 'normal', 'related_type': 'study_session', 'window': None,
+        'title': "Sessão produtiva! 💪",
+        'message': "Você estudou {discipline_name} por {hours:.1f} horas.",
+    },
+    'result_high': {
+        'type': 'performance', 'priority': 'normal', 'related_type': 'discipline', 'window': None,
+        'title': "Excelente resultado em {discipline_name}! 🌟",
+        'message': "Você acertou {percent:.1f}% dos exercícios em {title}.",
+    },
+    'result_low': {
+        'type': 'performance', 'priority': 'high', 'related_type': 'discipline', 'window': None,
+        'title': "Atenção ao resultado em {discipline_name}",
+        'message': "Você acertou {percent:.1f}% dos exercícios em {title}. Considere revisar o conteúdo.",
+    },
+    'performance_improved': {
+        'type': 'achievement', 'priority': 'normal', 'related_type': None, 'window': None,
+        'title': "Melhoria significativa! 📈",
+        'message': "Seu desempenho em {discipline_name} melhorou muito! Continue assim!",
+    },
+    'discipline_performance_low': {
+        'type': 'performance', 'priority': 'high', 'related_type': 'discipline', 'window': 'week',
+        'title': "Atenção ao desempenho em {discipline_name}",
+        'message': "Seu desempenho médio está em {avg_performance:.1f}%. Considere revisar o conteúdo.",
+    },
+    'discipline_performance_high': {
+        'type': 'performance', 'priority': 'normal', 'related_type': 'discipline', 'window': 'week',
+        'title': "Excelente desempenho em {discipline_name}! 🌟",
+        'message': "Seu desempenho médio está em {avg_performance:.1f}%. Continue assim!",
+    },
+    'weak_topic': {
+        'type': 'performance', 'priority': 'high', 'related_type': 'topic', 'window': 'week',
+        'title': "Tópico precisa de atenção: {topic_name}",
+        'message': "Seu desempenho neste tópico está em {avg_performance:.1f}%. Recomendamos revisar o conteúdo.",
+    },
+    'goal_completed': {
+        'type': 'goal', 'priority': 'normal', 'related_type': 'goal', 'window': None,
+        'title': "Meta alcançada em {discipline_name}! 🎉",
+        'message': "Você alcançou a meta de {target_value} {type}!",
+    },
+    'goal_failed': {
+        'type': 'goal', 'priority': 'high', 'related_type': 'goal', 'window': None,
+        'title': "Meta não alcançada em {discipline_name}",
+        'message': "A meta de {target_value} {type} não foi alcançada no prazo.",
+    },
+    'goal_ending': {
+        'type': 'goal', 'priority': 'normal', 'related_type': 'goal', 'window': 'day',
+        'title': "Meta próxima do fim em {discipline_name}",
+        'message': "Faltam {remaining:.0f} {type} e {days_remaining} dias para alcançar sua meta.",
+    },
+    'first_goal': {
+        'type': 'achievement', 'priority': 'normal', 'related_type': 'goal', 'window': None,
+        'title': "Primeira meta concluída! 🎯",
+        'message': "Parabéns! Você completou sua primeira meta em {discipline_name}.",
+    },
+    'exercise_milestone': {
+        'type': 'achievement', 'priority': 'normal', 'related_type': None, 'window': None,
+        'title': "{milestone} exercícios resolvidos! 📚",
+        'message': "Você está no caminho certo! Continue praticando.",
+    },
+    'high_streak': {
+        'type': 'achievement', 'priority': 'normal', 'related_type': None, 'window': 'week',
+        'title': "Sequência de alto desempenho! 🔥",
+        'message': "Você manteve um desempenho acima de 80% nas últimas 3 avaliações!",
+    },
+    'total_hours': {
+        'type': 'achievement', 'priority': 'normal', 'related_type': None, 'window': None,
+        'title': "{milestone} horas de estudo! ⏰",
+        'message': "Seu comprometimento está rendendo frutos. Continue dedicado!",
+    },
+}
+
+def notification_window(kind, when=None):
+    """
+    Identificador da janela de deduplicação: dia ('2025-08-26') ou semana ISO
+    ('2025-W35'), em UTC, o mesmo relógio de notification.created_at
+    (CURRENT_TIMESTAMP) usado pela migração das chaves antigas.
+    """
+    if kind is None:
+        return None
+    when = when or datetime.now(timezone.utc)
+    if kind == 'day':
+        return when.strftime('%Y-%m-%d')
+    year, week, _ = when.isocalendar()
+    return f"{year}-W{week:02d}"
+
+def notification_dedup_key(rule, related_id=None, scope=None, window=None):
+    return '|'.join('' if part is None else str(part) for part in (rule, related_id, scope, window))
+
+def emit_notification(conn, rule_name, related_id=None, scope=None, priority=None, **context):
+    """
+    Cria a notificação da regra, a menos que a mesma chave já exista.
+    'scope' distingue emissões da mesma regra/entidade (ex.: o marco atingido
+    ou o id do resultado). Retorna True se a notificação foi criada.
+    """
+    rule = NOTIFICATION_RULES[rule_name]
+    dedup_key = notification_dedup_key(rule_name, related_id, scope, notification_window(rule['window']))
+    created = conn.execute("""
+        INSERT INTO notification (type, title, message, priority, related_id, related_type, dedup_key)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(dedup_key) DO NOTHING
+    """, (rule['type'], rule['title'].format(**context), rule['message'].format(**context),
+          priority or rule['priority'], related_id, rule['related_type'], dedup_key))
+    if created.rowcount > 0:
+        # Publicada só depois do commit, para nunca anunciar algo que foi desfeito
+        row = dict(conn.execute("SELECT * FROM notification WHERE id = ?", (created.lastrowid,)).fetchone())
+        run_after_commit(conn, lambda: notification_bus.publish('notification', row))
+    return created.rowcount > 0
+
+# Títulos das notificações criadas antes da chave de deduplicação, para que
+# a migração reconheça as que já foram emitidas: padrão -> (regra, usa marco)
+LEGACY_NOTIFICATION_TITLES = [
+    (re.compile(r'^(\d+) horas de estudo em '), 'discipline_hours'),
+    (re.compile(r'^(\d+) horas de estudo!'), 'total_hours'),
+    (re.compile(r'^(\d+) exercícios resolvidos'), 'exercise_milestone'),
+    (re.compile(r'^Primeira meta concluída'), 'first_goal'),
+    (re.compile(r'^Meta alcançada em '), 'goal_completed'),
+    (re.compile(r'^Meta não alcançada em '), 'goal_failed'),
+    (re.compile(r'^Meta próxima do fim em '), 'goal_ending'),
+    (re.compile(r'^Sessão produtiva'), 'long_session'),
+    (re.compile(r'^Sequência de alto desempenho'), 'high_streak'),
+    (re.compile(r'^Atenção ao desempenho em '), 'discipline_performance_low'),
+    (re.compile(r'^Excelente desempenho em '), 'discipline_performance_high'),
+    (re.compile(r'^Tópico precisa de atenção'), 'weak_topic'),
+]
+
+def backfill_notification_keys(conn):
+    """
+    Atribui a chave de deduplicação às notificações existentes que uma regra
+    reconhece. Só a primeira de cada chave é marcada; duplicatas antigas
+    ficam sem chave.
+    """
+    used = set()
+    updates = []
+    for row in conn.execute("SELECT id, title, related_id, created_at FROM notification ORDER BY id"):
+        for pattern, rule_name in LEGACY_NOTIFICATION_TITLES:
+            match = pattern.match(row['title'])
+            if not match:
+                continue
+            created_at = datetime.strptime(row['created_at'][:19], '%Y-%m-%d %H:%M:%S')
+            window = notification_window(NOTIFICATION_RULES[rule_name]['window'], created_at)
+            related_id = row['related_id'] if NOTIFICATION_RULES[rule_name]['related_type'] else None
+            key = notification_dedup_key(rule_name, related_id, match.group(1) if match.groups() else None, window)
+            if key not in used:
+                used.add(key)
+                updates.append((key, row['id']))
+            break
+    conn.executemany("UPDATE notification SET dedup_key = ? WHERE id = ?", updates)
 
 # --- Servindo o Frontend ---
 @app.route('/', defaults={'path': ''})
@@ -1103,30 +2873,7 @@ def serve(path):
 # --- Inicialização ---
 with app.app_context():
     create_tables(get_db_connection())
-
-def create_achievement_notification(conn, title, message, related_id=None, related_type=None):
-    """Cria uma notificação de conquista"""
-    conn.execute("""
-        INSERT INTO notification (type, title, message, priority, related_id, related_type)
-        VALUES ('achievement', ?, ?, 'normal', ?, ?)
-    """, (title, message, related_id, related_type))
-    conn.commit()
-
-def create_goal_notification(conn, title, message, priority='normal', related_id=None):
-    """Cria uma notificação relacionada a uma meta"""
-    conn.execute("""
-        INSERT INTO notification (type, title, message, priority, related_id, related_type)
-        VALUES ('goal', ?, ?, ?, ?, 'goal')
-    """, (title, message, priority, related_id))
-    conn.commit()
-
-def create_performance_notification(conn, title, message, priority='normal', related_id=None, related_type=None):
-    """Cria uma notificação relacionada ao desempenho"""
-    conn.execute("""
-        INSERT INTO notification (type, title, message, priority, related_id, related_type)
-        VALUES ('performance', ?, ?, ?, ?, ?)
-    """, (title, message, priority, related_id, related_type))
-    conn.commit()
+    run_migrations(get_db_connection())
 
 def check_goals_status(conn):
     """
@@ -1144,87 +2891,33 @@ def check_goals_status(conn):
         WHERE g.status = 'active'
     """).fetchall()
     
+    today = datetime.now().date()
+    expired, ending = [], []
     for goal in goals:
-        goal_dict = dict(goal)
-        
-        # Verificar metas vencidas
-        end_date = datetime.strptime(goal_dict['end_date'], '%Y-%m-%d').date()
-        today = datetime.now().date()
-        
+        end_date = datetime.strptime(goal['end_date'], '%Y-%m-%d').date()
         if end_date < today:
-            # Marcar meta como falha
-            conn.execute("UPDATE study_goal SET status = 'failed' WHERE id = ?", (goal_dict['id'],))
-            
-            create_goal_notification(
-                conn,
-                f"Meta não alcançada em {goal_dict['discipline_name']}",
-                f"A meta de {goal_dict['target_value']} {goal_dict['type']} não foi alcançada no prazo.",
-                'high',
-                goal_dict['id']
-            )
+            expired.append(dict(goal))
+        elif (end_date - today).days <= 3:
+            ending.append(goal)
+    
+    for goal_dict in expired:
+        # Marcar meta como falha
+        conn.execute("UPDATE study_goal SET status = 'failed' WHERE id = ?", (goal_dict['id'],))
+        emit_notification(conn, 'goal_failed', goal_dict['id'], **goal_dict)
+    
+    # Conclui as metas que atingiram 100% e atualiza os snapshots
+    evaluated = {goal['id']: goal for goal in evaluate_goal_states(conn)}
+    
+    # Verificar metas próximas do fim (3 dias) que ainda não foram alcançadas
+    for goal in ending:
+        goal_dict = evaluated.get(goal['id'])
+        if not goal_dict or goal_dict['progress_percent'] >= 100:
             continue
-        
-        # Verificar metas próximas do fim (3 dias)
-        days_remaining = (end_date - today).days
-        if days_remaining <= 3:
-            # Buscar progresso atual
-            if goal_dict['type'] == 'study_time':
-                progress = conn.execute("""
-                    SELECT COALESCE(SUM(duration_minutes), 0) as total_minutes
-                    FROM study_session s
-                    JOIN task t ON s.task_id = t.id
-                    WHERE t.discipline_id = ?
-                    AND date(s.start) >= ?
-                    AND date(s.start) <= ?
-                """, (goal_dict['discipline_id'], goal_dict['start_date'], goal_dict['end_date'])).fetchone()
-                
-                current_value = progress['total_minutes']
-                
-            elif goal_dict['type'] == 'performance':
-                progress = conn.execute("""
-                    SELECT AVG(r.percent) as avg_performance
-                    FROM result r
-                    JOIN task t ON r.task_id = t.id
-                    WHERE t.discipline_id = ?
-                    AND date(r.created_at) >= ?
-                    AND date(r.created_at) <= ?
-                """, (goal_dict['discipline_id'], goal_dict['start_date'], goal_dict['end_date'])).fetchone()
-                
-                current_value = progress['avg_performance'] or 0
-                
-            elif goal_dict['type'] == 'exercises_completed':
-                progress = conn.execute("""
-                    SELECT COALESCE(SUM(r.total), 0) as total_exercises
-                    FROM result r
-                    JOIN task t ON r.task_id = t.id
-                    WHERE t.discipline_id = ?
-                    AND date(r.created_at) >= ?
-                    AND date(r.created_at) <= ?
-                """, (goal_dict['discipline_id'], goal_dict['start_date'], goal_dict['end_date'])).fetchone()
-                
-                current_value = progress['total_exercises']
-            
-            progress_percent = (current_value / goal_dict['target_value']) * 100
-            
-            # Se meta já foi alcançada
-            if progress_percent >= 100:
-                conn.execute("UPDATE study_goal SET status = 'completed' WHERE id = ?", (goal_dict['id'],))
-                create_goal_notification(
-                    conn,
-                    f"Meta alcançada em {goal_dict['discipline_name']}! 🎉",
-                    f"Você alcançou a meta de {goal_dict['target_value']} {goal_dict['type']}!",
-                    'normal',
-                    goal_dict['id']
-                )
-            else:
-                remaining = goal_dict['target_value'] - current_value
-                create_goal_notification(
-                    conn,
-                    f"Meta próxima do fim em {goal_dict['discipline_name']}",
-                    f"Faltam {remaining:.0f} {goal_dict['type']} e {days_remaining} dias para alcançar sua meta.",
-                    'high' if days_remaining <= 1 else 'normal',
-                    goal_dict['id']
-                )
+        days_remaining = (datetime.strptime(goal_dict['end_date'], '%Y-%m-%d').date() - today).days
+        emit_notification(conn, 'goal_ending', goal_dict['id'],
+                          priority='high' if days_remaining <= 1 else 'normal',
+                          remaining=goal_dict['target_value'] - goal_dict['current_value'],
+                          days_remaining=days_remaining, **goal_dict)
 
 def check_performance_alerts(conn):
     """
@@ -1254,25 +2947,11 @@ def check_performance_alerts(conn):
         
         # Alerta de baixo desempenho
         if perf_dict['avg_performance'] < 60:
-            create_performance_notification(
-                conn,
-                f"Atenção ao desempenho em {perf_dict['discipline_name']}",
-                f"Seu desempenho médio está em {perf_dict['avg_performance']:.1f}%. Considere revisar o conteúdo.",
-                'high',
-                perf_dict['discipline_id'],
-                'discipline'
-            )
+            emit_notification(conn, 'discipline_performance_low', perf_dict['discipline_id'], **perf_dict)
         
         # Reconhecimento de alto desempenho
         elif perf_dict['avg_performance'] > 80:
-            create_performance_notification(
-                conn,
-                f"Excelente desempenho em {perf_dict['discipline_name']}! 🌟",
-                f"Seu desempenho médio está em {perf_dict['avg_performance']:.1f}%. Continue assim!",
-                'normal',
-                perf_dict['discipline_id'],
-                'discipline'
-            )
+            emit_notification(conn, 'discipline_performance_high', perf_dict['discipline_id'], **perf_dict)
     
     # Verificar tópicos com baixo desempenho
     weak_topics = conn.execute("""
@@ -1300,14 +2979,7 @@ def check_performance_alerts(conn):
     
     for topic in weak_topics:
         topic_dict = dict(topic)
-        create_performance_notification(
-            conn,
-            f"Tópico precisa de atenção: {topic_dict['topic_name']}",
-            f"Seu desempenho neste tópico está em {topic_dict['avg_performance']:.1f}%. Recomendamos revisar o conteúdo.",
-            'high',
-            topic_dict['topic_id'],
-            'topic'
-        )
+        emit_notification(conn, 'weak_topic', topic_dict['topic_id'], **topic_dict)
 
 def monitor_achievements(conn):
     """Monitora e cria notificações para conquistas do usuário"""
@@ -1323,22 +2995,7 @@ def monitor_achievements(conn):
     """).fetchone()
     
     if first_goal:
-        # Verifica se já existe notificação para esta conquista
-        notification_exists = conn.execute("""
-            SELECT 1 FROM notification 
-            WHERE type = 'achievement' 
-            AND title LIKE '%Primeira meta%'
-            AND related_id = ?
-        """, (first_goal['id'],)).fetchone()
-        
-        if not notification_exists:
-            create_achievement_notification(
-                conn,
-                "Primeira meta concluída! 🎯",
-                f"Parabéns! Você completou sua primeira meta em {dict(first_goal)['discipline_name']}.",
-                first_goal['id'],
-                'goal'
-            )
+        emit_notification(conn, 'first_goal', first_goal['id'], **dict(first_goal))
     
     # Conquista: 100 exercícios resolvidos
     exercises_count = conn.execute("""
@@ -1349,18 +3006,7 @@ def monitor_achievements(conn):
     milestones = [100, 500, 1000, 5000]
     for milestone in milestones:
         if exercises_count >= milestone:
-            notification_exists = conn.execute("""
-                SELECT 1 FROM notification 
-                WHERE type = 'achievement' 
-                AND title LIKE ?
-            """, (f'%{milestone} exercícios%',)).fetchone()
-            
-            if not notification_exists:
-                create_achievement_notification(
-                    conn,
-                    f"{milestone} exercícios resolvidos! 📚",
-                    "Você está no caminho certo! Continue praticando."
-                )
+            emit_notification(conn, 'exercise_milestone', scope=milestone, milestone=milestone)
     
     # Conquista: Sequência de alto desempenho (3 resultados seguidos acima de 80%)
     high_performance_streak = conn.execute("""
@@ -1379,20 +3025,8 @@ def monitor_achievements(conn):
     """).fetchone()['streak']
     
     if high_performance_streak >= 3:
-        # Verifica se já existe notificação recente (últimos 7 dias) para esta conquista
-        notification_exists = conn.execute("""
-            SELECT 1 FROM notification 
-            WHERE type = 'achievement' 
-            AND title LIKE '%Sequência de alto desempenho%'
-            AND created_at >= date('now', '-7 days')
-        """).fetchone()
-        
-        if not notification_exists:
-            create_achievement_notification(
-                conn,
-                "Sequência de alto desempenho! 🔥",
-                "Você manteve um desempenho acima de 80% nas últimas 3 avaliações!"
-            )
+        # No máximo uma por semana
+        emit_notification(conn, 'high_streak')
     
     # Conquista: 10 horas de estudo
     study_hours = conn.execute("""
@@ -1403,29 +3037,94 @@ def monitor_achievements(conn):
     hour_milestones = [10, 50, 100, 500]
     for milestone in hour_milestones:
         if study_hours >= milestone:
-            notification_exists = conn.execute("""
-                SELECT 1 FROM notification 
-                WHERE type = 'achievement' 
-                AND title LIKE ?
-            """, (f'%{milestone} horas%',)).fetchone()
-            
-            if not notification_exists:
-                create_achievement_notification(
-                    conn,
-                    f"{milestone} horas de estudo! ⏰",
-                    "Seu comprometimento está rendendo frutos. Continue dedicado!"
-                )
+            emit_notification(conn, 'total_hours', scope=milestone, milestone=milestone)
 
 def check_notifications():
     """Verifica e gera todas as notificações necessárias"""
-    conn = get_db_connection()
-    check_goals_status(conn)
-    check_performance_alerts(conn)
-    monitor_achievements(conn)
+    with unit_of_work(get_db_connection()) as conn:
+        check_goals_status(conn)
+        check_performance_alerts(conn)
+        monitor_achievements(conn)
+
+def start_startup_checks():
+    """
+    Roda as verificações de notificação da inicialização em segundo plano,
+    para o servidor começar a responder sem esperar por elas. As notificações
+    geradas chegam ao frontend pelo stream (/api/notifications/stream).
+    """
+    def run():
+        with app.app_context():
+            try:
+                check_notifications()
+            except Exception:
+                traceback.print_exc()
+    thread = threading.Thread(target=run, name="startup-checks", daemon=True)
+    thread.start()
+    return thread
+
+# --- Servidor ---
+# Modo 'dev': servidor de desenvolvimento do Flask (debug e reloader).
+# Modo 'production': servidor WSGI waitress, com pool de threads, keep-alive,
+# timeout de conexão inativa e encerramento gracioso. É o padrão no executável
+# do PyInstaller. Sem o waitress instalado, cai no servidor threaded do
+# werkzeug, sem debug.
+def parse_server_args(argv=None):
+    """Opções do servidor; cada uma também pode vir de variável de ambiente."""
+    env = os.environ.get
+    parser = argparse.ArgumentParser(description="Backend do Plano de Estudos")
+    parser.add_argument('--mode', choices=('dev', 'production'),
+                        default=env('PLANO_SERVER_MODE', 'production' if getattr(sys, 'frozen', False) else 'dev'))
+    parser.add_argument('--host', default=env('PLANO_HOST', '127.0.0.1'))
+    # Porta 5000, como esperado pelo Electron e pelo script 'electron:dev'
+    parser.add_argument('--port', type=int, default=int(env('PLANO_PORT', 5000)))
+    # Cada stream SSE aberto ocupa uma thread enquanto durar
+    parser.add_argument('--threads', type=int, default=int(env('PLANO_SERVER_THREADS', 8)))
+    parser.add_argument('--channel-timeout', type=int, default=int(env('PLANO_CHANNEL_TIMEOUT', 60)),
+                        help="segundos até fechar uma conexão inativa (keep-alive ou request incompleto)")
+    parser.add_argument('--connection-limit', type=int, default=int(env('PLANO_CONNECTION_LIMIT', 100)))
+    return parser.parse_args(argv)
+
+def serve_production(options):
+    """Serve com o waitress até SIGTERM/SIGINT; termina os requests em andamento antes de sair."""
+    try:
+        from waitress.server import create_server
+    except ImportError:
+        create_server = None
+    if create_server is None:
+        from werkzeug.serving import make_server
+        print("waitress não instalado; usando o servidor threaded do werkzeug (sem debug)")
+        server = make_server(options.host, options.port, app, threaded=True)
+        def stop(signum, frame):
+            notification_bus.close()
+            threading.Thread(target=server.shutdown).start()
+        run, port = server.serve_forever, server.port
+    else:
+        server = create_server(app, host=options.host, port=options.port, threads=options.threads,
+                               channel_timeout=options.channel_timeout,
+                               connection_limit=options.connection_limit, ident="plano-estudos")
+        # Com SystemExit o waitress para de aceitar conexões e espera (até 5 s)
+        # as threads terminarem os requests em andamento
+        def stop(signum, frame):
+            notification_bus.close()  # Streams SSE abertos terminam já, sem esperar o timeout
+            sys.exit(0)
+        run, port = server.run, server.effective_port
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    # O Electron espera por "Running on" na saída padrão para abrir a janela
+    print(f" * Running on http://{options.host}:{port} (modo production, {options.threads} threads)", flush=True)
+    try:
+        run()
+    finally:
+        db_pool.close_idle()
+        print("Servidor encerrado.", flush=True)
 
 # --- Inicialização ---
 if __name__ == '__main__':
+    options = parse_server_args()
     print("Backend Flask INICIADO com sucesso!")
-    check_notifications()  # Verifica notificações ao iniciar
-    # Garante que o servidor Flask rode na porta 5000, como esperado pelo script 'electron:dev'
-    app.run(debug=True, port=5000)
+    start_startup_checks()  # Verifica notificações ao iniciar, sem bloquear o servidor
+    goal_evaluator.start()
+    if options.mode == 'production':
+        serve_production(options)
+    else:
+        app.run(debug=True, host=options.host, port=options.port)
@@ -0,0 +1,101 @@
+"""
+Benchmark: quantos COMMITs (e, portanto, fsyncs do journal) cada request de
+escrita provoca. Executa os endpoints sobre uma cópia temporária do data.db e
+conta os COMMITs emitidos pela thread do request via trace callback; escritas
+do avaliador de metas em segundo plano ficam de fora.
+
+Para comparar com outra versão do backend, aponte --app para o app.py dela:
+    git show <commit>:plano-estudos-backend/app.py > /tmp/app_antigo.py
+    python benchmarks/bench_commits_per_request.py --app /tmp/app_antigo.py
+
+Uso:
+    python benchmarks/bench_commits_per_request.py [--app caminho/app.py] [--profile compat]
+"""
+import argparse
+import contextlib
+import importlib.util
+import io
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def requests_to_run(task_id, discipline_id):
+    return [
+        ('POST', '/api/sessions/save', {'task_id': task_id, 'start': '2025-01-01T10:00:00Z',
+                                        'end': '2025-01-01T13:00:00Z', 'duration_minutes': 180}),
+        ('POST', '/api/results', {'task_id': task_id, 'correct': 9, 'total': 10}),
+        ('POST', '/api/results', {'task_id': task_id, 'correct': 3, 'total': 10}),
+        ('POST', '/api/notifications/check', None),
+        ('POST', '/api/tasks', {'title': 'Tarefa do benchmark', 'discipline_id': discipline_id}),
+        ('POST', '/api/goals', {'discipline_id': discipline_id, 'type': 'study_time', 'target_value': 60,
+                                'period': 'weekly', 'start_date': '2025-01-01', 'end_date': '2025-01-08'}),
+    ]
+
+
+def load_backend(app_path, db_copy, profile):
+    os.environ['PLANO_DB_FILE'] = db_copy
+    os.environ['PLANO_DB_PROFILE'] = profile
+    sys.path.insert(0, BACKEND_DIR)
+    spec = importlib.util.spec_from_file_location('app_benchmark', app_path)
+    backend = importlib.util.module_from_spec(spec)
+    with contextlib.redirect_stdout(io.StringIO()):
+        spec.loader.exec_module(backend)
+    return backend
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--app', default=os.path.join(BACKEND_DIR, 'app.py'))
+    parser.add_argument('--profile', default='compat', help="perfil de armazenamento (compat faz fsync a cada commit)")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    db_copy = os.path.join(tmp, 'data.db')
+    shutil.copy(os.path.join(BACKEND_DIR, 'data.db'), db_copy)
+    backend = load_backend(os.path.abspath(args.app), db_copy, args.profile)
+
+    request_thread = threading.get_ident()
+    commits = [0]
+
+    def count_commits(statement):
+        if statement.strip().upper() == 'COMMIT' and threading.get_ident() == request_thread:
+            commits[0] += 1
+
+    original_factory = backend.db_pool._factory
+
+    def tracing_factory():
+        conn = original_factory()
+        conn.set_trace_callback(count_commits)
+        return conn
+
+    backend.db_pool._factory = tracing_factory
+    while backend.db_pool._idle:
+        backend.db_pool._discard(backend.db_pool.acquire())
+
+    with backend.app.app_context():
+        row = backend.get_db_connection().execute("SELECT id, discipline_id FROM task ORDER BY id LIMIT 1").fetchone()
+
+    client = backend.app.test_client()
+    total_commits, total_time = 0, 0.0
+    print(f"{'request':45s} {'status':>6s} {'commits':>8s} {'ms':>8s}")
+    for method, path, payload in requests_to_run(row['id'], row['discipline_id']):
+        commits[0] = 0
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            response = client.open(path, method=method, json=payload)
+        elapsed = (time.perf_counter() - started) * 1000
+        total_commits += commits[0]
+        total_time += elapsed
+        print(f"{method + ' ' + path:45s} {response.status_code:>6d} {commits[0]:>8d} {elapsed:>8.1f}")
+    print(f"{'total':45s} {'':>6s} {total_commits:>8d} {total_time:>8.1f}")
+    shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
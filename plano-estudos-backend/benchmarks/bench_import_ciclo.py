@@ -0,0 +1,144 @@
+"""
+Benchmark: importação da aba CICLO com uma planilha sintética.
+
+Compara a implementação antiga (iterrows + consultas por linha) com o
+pipeline vetorizado de import_ciclo_frame. As duas rodam sobre bancos
+temporários vazios, a partir do mesmo DataFrame, e o resultado é conferido.
+A leitura do .xlsx fica de fora para medir só o pipeline de importação.
+
+Uso:
+    python benchmarks/bench_import_ciclo.py [--rows 50000]
+"""
+import argparse
+import contextlib
+import datetime
+import io
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def synthetic_ciclo(rows, seed=42):
+    rng = np.random.default_rng(seed)
+    disciplines = [f"DISCIPLINA {i}" for i in range(20)]
+    done = rng.random(rows) < 0.4
+    totals = np.where(rng.random(rows) < 0.5, rng.integers(1, 40, rows), 0).astype(float)
+    return pd.DataFrame({
+        'TRILHA': [f"Trilha {i // 20}" for i in range(rows)],
+        'DATA': pd.to_datetime(np.where(done, '2025-07-03', None)),
+        'TAREFA': np.arange(1, rows + 1),
+        'DISCIPLINA': rng.choice(disciplines, rows),
+        'CH': [datetime.time(1, 30)] * rows,
+        'CH (EFETIVA)': [datetime.time(2, 0) if d else np.nan for d in done],
+        'TAREFAS': [f"Estudo da aula {i}" for i in range(rows)],
+        'TOTAL QUESTÕES': totals,
+        'TOTAL ACERTOS': np.floor(totals * rng.random(rows)),
+    })
+
+
+def legacy_import(conn, df, convert_time_to_minutes):
+    """Cópia da implementação anterior de import_ciclo_from_excel (linha a linha)."""
+    df.columns = [c.strip() for c in df.columns]
+    cursor = conn.cursor()
+    for i, row in df.iterrows():
+        task_id_raw = row.get('TAREFA')
+        if pd.isna(task_id_raw): continue
+        try: task_id_sheet = float(task_id_raw)
+        except: continue
+        task_date_str = row.get('DATA')
+        status = 'Pendente'
+        completion_date = None
+        if pd.notna(task_date_str):
+            status = 'Concluída'
+            completion_date = pd.to_datetime(task_date_str, errors='coerce').strftime('%Y-%m-%d')
+        trilha_name = row.get('TRILHA'); trilha_id = None
+        if pd.notna(trilha_name):
+            cursor.execute("INSERT OR IGNORE INTO trilha (name) VALUES (?)", (str(trilha_name),))
+            trilha_id = cursor.execute("SELECT id FROM trilha WHERE name = ?", (str(trilha_name),)).fetchone()[0]
+        disc_name = row.get('DISCIPLINA'); disc_id = None
+        if pd.notna(disc_name):
+            disc_id_res = cursor.execute("SELECT id FROM discipline WHERE name = ?", (disc_name,)).fetchone()
+            if not disc_id_res: continue
+            disc_id = disc_id_res[0]
+        else: continue
+        ch_efetiva_min = convert_time_to_minutes(row.get('CH (EFETIVA)'))
+        cursor.execute("""INSERT OR IGNORE INTO task (spreadsheet_task_id, title, discipline_id, trilha_id, completion_date,
+                          carga_horaria_planejada_minutos, carga_horaria_realizada_minutos, status)
+                          VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                       (task_id_sheet, row.get('TAREFAS'), disc_id, trilha_id, completion_date,
+                        convert_time_to_minutes(row.get('CH')), ch_efetiva_min, status))
+        if cursor.rowcount > 0:
+            task_id_db = cursor.lastrowid
+            q_total, q_correct = row.get('TOTAL QUESTÕES', 0), row.get('TOTAL ACERTOS', 0)
+            if pd.notna(q_total) and q_total > 0:
+                percent = (q_correct / q_total) * 100 if q_total > 0 else 0
+                cursor.execute("INSERT INTO result (task_id, correct, total, percent, created_at) VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)",
+                               (task_id_db, q_correct, q_total, percent))
+    conn.commit()
+
+
+def fresh_db(backend, directory, name, disciplines):
+    conn = sqlite3.connect(os.path.join(directory, name))
+    conn.execute("PRAGMA foreign_keys = ON")
+    backend.create_tables(conn)
+    backend.run_migrations(conn)
+    conn.executemany("INSERT INTO discipline (name) VALUES (?)", [(d,) for d in disciplines])
+    conn.commit()
+    return conn
+
+
+def snapshot(conn):
+    return (
+        conn.execute("SELECT spreadsheet_task_id, title, discipline_id, trilha_id, completion_date, status, "
+                     "carga_horaria_planejada_minutos, carga_horaria_realizada_minutos FROM task ORDER BY spreadsheet_task_id").fetchall(),
+        conn.execute("SELECT t.spreadsheet_task_id, r.correct, r.total, round(r.percent, 9) FROM result r "
+                     "JOIN task t ON r.task_id = t.id ORDER BY t.spreadsheet_task_id").fetchall(),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=50000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['PLANO_DB_FILE'] = os.path.join(tmp, 'app.db')
+        sys.path.insert(0, BACKEND_DIR)
+        with contextlib.redirect_stdout(io.StringIO()):
+            import app as backend
+
+        df = synthetic_ciclo(args.rows)
+        disciplines = sorted(df['DISCIPLINA'].unique())
+
+        legacy_conn = fresh_db(backend, tmp, 'legacy.db', disciplines)
+        started = time.perf_counter()
+        legacy_import(legacy_conn, df.copy(), backend.convert_time_to_minutes)
+        legacy_time = time.perf_counter() - started
+
+        bulk_conn = fresh_db(backend, tmp, 'bulk.db', disciplines)
+        bulk_conn.row_factory = sqlite3.Row
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            backend.import_ciclo_frame(bulk_conn, df.copy(), update_evolution=False)
+        bulk_time = time.perf_counter() - started
+        bulk_conn.row_factory = None
+
+        identical = snapshot(legacy_conn) == snapshot(bulk_conn)
+        legacy_conn.close(); bulk_conn.close()
+
+    print(f"linhas:            {args.rows}")
+    print(f"linha a linha:     {legacy_time:.2f} s")
+    print(f"vetorizado/lote:   {bulk_time:.2f} s")
+    print(f"speedup:           {legacy_time / bulk_time:.1f}x")
+    print(f"resultado idêntico: {identical}")
+
+
+if __name__ == '__main__':
+    main()
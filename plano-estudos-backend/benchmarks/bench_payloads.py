@@ -0,0 +1,69 @@
+"""
+Benchmark: tamanho e tempo de GET /api/tasks com projeção (?fields=),
+codificação colunar (?format=columns) e compressão (Accept-Encoding).
+Roda sobre uma cópia temporária do data.db acrescida de tarefas sintéticas.
+
+Uso:
+    python benchmarks/bench_payloads.py [--tasks 20000] [--repeat 5]
+"""
+import argparse
+import contextlib
+import io
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+VARIANTS = [
+    ('completo', '/api/tasks', ''),
+    ('completo + gzip', '/api/tasks', 'gzip'),
+    ('completo + br', '/api/tasks', 'br'),
+    ('fields=id,title', '/api/tasks?fields=id,title', ''),
+    ('fields + colunar', '/api/tasks?fields=id,title&format=columns', ''),
+    ('fields + colunar + gzip', '/api/tasks?fields=id,title&format=columns', 'gzip'),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--tasks', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    db_copy = os.path.join(tmp, 'data.db')
+    shutil.copy(os.path.join(BACKEND_DIR, 'data.db'), db_copy)
+    os.environ['PLANO_DB_FILE'] = db_copy
+    sys.path.insert(0, BACKEND_DIR)
+    with contextlib.redirect_stdout(io.StringIO()):
+        import app as backend
+
+    with backend.app.app_context():
+        conn = backend.get_db_connection()
+        discipline_id = conn.execute("SELECT id FROM discipline ORDER BY id LIMIT 1").fetchone()['id']
+        conn.executemany("INSERT INTO task (title, discipline_id, status, carga_horaria_planejada_minutos) VALUES (?, ?, 'Pendente', 90)",
+                         [(f"Estudo da aula {i:05d} e resolução de questões", discipline_id) for i in range(args.tasks)])
+        conn.commit()
+
+    client = backend.app.test_client()
+    print(f"{'variante':28s} {'bytes':>12s} {'ms (mediana)':>14s}")
+    for name, path, encoding in VARIANTS:
+        if encoding == 'br' and backend.brotli is None:
+            print(f"{name:28s} {'(brotli não instalado)':>27s}")
+            continue
+        headers = {'Accept-Encoding': encoding}
+        samples, size = [], 0
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            size = len(client.get(path, headers=headers).data)
+            samples.append((time.perf_counter() - started) * 1000)
+        print(f"{name:28s} {size:>12d} {statistics.median(samples):>14.1f}")
+    shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
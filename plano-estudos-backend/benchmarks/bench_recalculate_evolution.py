@@ -0,0 +1,108 @@
+"""
+Benchmark: rebuild completo da evolução (compute_evolution_snapshot e
+recalculate_evolution) sobre uma cópia temporária do data.db acrescida de
+sessões e resultados sintéticos, espalhados pelas tarefas e pelos últimos
+dias. Ao final confere que o rebuild bate com /api/evolution/consistency.
+
+Para comparar com outra versão do backend, aponte --app para o app.py dela:
+    git show <commit>:plano-estudos-backend/app.py > /tmp/app_antigo.py
+    python benchmarks/bench_recalculate_evolution.py --app /tmp/app_antigo.py
+
+Uso:
+    python benchmarks/bench_recalculate_evolution.py [--app caminho/app.py] [--sessions 100000]
+        [--results 100000] [--days 365] [--repeat 3]
+"""
+import argparse
+import contextlib
+import importlib.util
+import io
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def load_backend(app_path):
+    spec = importlib.util.spec_from_file_location('app', app_path)
+    backend = importlib.util.module_from_spec(spec)
+    sys.modules['app'] = backend
+    with contextlib.redirect_stdout(io.StringIO()):
+        spec.loader.exec_module(backend)
+    return backend
+
+
+def seed(conn, sessions, results, days):
+    random.seed(42)
+    task_ids = [row[0] for row in conn.execute("SELECT id FROM task")]
+    first_day = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=days)
+    when = lambda: first_day + timedelta(days=random.randrange(days), hours=random.randint(8, 22))
+    conn.executemany('INSERT INTO study_session (task_id, start, duration_minutes) VALUES (?, ?, ?)',
+                     [(random.choice(task_ids), when().strftime('%Y-%m-%dT%H:%M:%S'), random.randint(10, 120))
+                      for _ in range(sessions)])
+    rows = []
+    for _ in range(results):
+        total = random.randint(5, 40)
+        correct = random.randint(0, total)
+        rows.append((random.choice(task_ids), correct, total, correct / total * 100, when().strftime('%Y-%m-%d %H:%M:%S')))
+    conn.executemany("INSERT INTO result (task_id, correct, total, percent, created_at) VALUES (?, ?, ?, ?, ?)", rows)
+    conn.commit()
+
+
+def median_ms(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--app', default=os.path.join(BACKEND_DIR, 'app.py'))
+    parser.add_argument('--sessions', type=int, default=100000)
+    parser.add_argument('--results', type=int, default=100000)
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    db_copy = os.path.join(tmp, 'data.db')
+    shutil.copy(os.path.join(BACKEND_DIR, 'data.db'), db_copy)
+    os.environ['PLANO_DB_FILE'] = db_copy
+    sys.path.insert(0, BACKEND_DIR)
+    backend = load_backend(os.path.abspath(args.app))
+
+    with backend.app.app_context():
+        conn = backend.get_db_connection()
+        seed(conn, args.sessions, args.results, args.days)
+        # Carrega pandas/numpy fora da medição
+        backend.compute_evolution_snapshot(conn)
+
+        snapshot_ms = median_ms(lambda: backend.compute_evolution_snapshot(conn), args.repeat)
+
+        def rebuild():
+            with contextlib.redirect_stdout(io.StringIO()):
+                backend.recalculate_evolution(conn)
+            conn.commit()
+        rebuild_ms = median_ms(rebuild, args.repeat)
+        history_rows, evolution_rows = backend.compute_evolution_snapshot(conn)[:2]
+
+    consistency = backend.app.test_client().get('/api/evolution/consistency').get_json()
+    shutil.rmtree(tmp, ignore_errors=True)
+
+    print(f"{args.sessions} sessões, {args.results} resultados: "
+          f"{len(history_rows)} linhas de histórico, {len(evolution_rows)} de evolução")
+    print(f"compute_evolution_snapshot (mediana): {snapshot_ms:8.1f} ms")
+    print(f"recalculate_evolution (mediana):      {rebuild_ms:8.1f} ms")
+    print(f"consistente após o rebuild: {consistency['consistent']}")
+
+
+if __name__ == '__main__':
+    main()
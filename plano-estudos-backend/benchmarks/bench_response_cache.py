@@ -0,0 +1,72 @@
+"""
+Benchmark: latência dos endpoints de leitura do painel com e sem o cache de
+respostas. "sem cache" invalida todas as tabelas antes de cada request; "com
+cache" repete o request com a entrada já pronta; "304" revalida com
+If-None-Match. Roda sobre uma cópia temporária do data.db.
+
+Uso:
+    python benchmarks/bench_response_cache.py [--requests 200]
+"""
+import argparse
+import contextlib
+import io
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+ENDPOINTS = [
+    '/api/dashboard/summary',
+    '/api/evolution',
+    '/api/topics/performance',
+    '/api/topics/performance?days=30',
+    '/api/performance/history',
+    '/api/trilhas',
+]
+
+
+def median_ms(fn, n):
+    samples = []
+    for _ in range(n):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=200)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    db_copy = os.path.join(tmp, 'data.db')
+    shutil.copy(os.path.join(BACKEND_DIR, 'data.db'), db_copy)
+    os.environ['PLANO_DB_FILE'] = db_copy
+    sys.path.insert(0, BACKEND_DIR)
+    with contextlib.redirect_stdout(io.StringIO()):
+        import app as backend
+    client = backend.app.test_client()
+    cache = backend.response_cache
+
+    def uncached(path):
+        cache.bump()
+        client.get(path)
+
+    print(f"{'endpoint':36s} {'sem cache':>10s} {'com cache':>10s} {'304':>10s}  (mediana, ms)")
+    for path in ENDPOINTS:
+        cold = median_ms(lambda: uncached(path), args.requests)
+        etag = client.get(path).headers['ETag']
+        warm = median_ms(lambda: client.get(path), args.requests)
+        revalidated = median_ms(lambda: client.get(path, headers={'If-None-Match': etag}), args.requests)
+        print(f"{path:36s} {cold:>10.2f} {warm:>10.2f} {revalidated:>10.2f}")
+    print(cache.metrics())
+    shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+"""
+Teste de carga: requests/s em GET /api/tasks com o backend servido em modo
+'dev' (app.run com debug) e em modo 'production' (waitress). Cada modo roda
+como subprocesso (`python app.py --mode ...`) sobre uma cópia temporária do
+data.db; os clientes usam conexões keep-alive.
+
+Uso:
+    python benchmarks/bench_serving_modes.py [--seconds 10] [--clients 8] [--path /api/tasks]
+"""
+import argparse
+import http.client
+import os
+import shutil
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_ready(port, path, timeout=60):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+            conn.request('GET', path)
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError("o backend não respondeu dentro do tempo limite")
+
+
+def client(port, path, stop, latencies, errors):
+    conn = None
+    while not stop.is_set():
+        started = time.perf_counter()
+        try:
+            if conn is None:
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+            conn.request('GET', path)
+            response = conn.getresponse()
+            response.read()
+            if response.status != 200:
+                errors.append(response.status)
+                continue
+            latencies.append((time.perf_counter() - started) * 1000)
+            if response.getheader('Connection', '').lower() == 'close':
+                conn.close(); conn = None
+        except (OSError, http.client.HTTPException) as e:
+            errors.append(type(e).__name__)
+            if conn is not None: conn.close()
+            conn = None
+    if conn is not None: conn.close()
+
+
+def run_mode(mode, args, db_copy):
+    port = free_port()
+    env = {**os.environ, 'PLANO_DB_FILE': db_copy}
+    # Sessão própria: o modo dev tem o processo do reloader e o filho que serve
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(BACKEND_DIR, 'app.py'), '--mode', mode, '--port', str(port),
+         '--threads', str(args.threads)],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True)
+    try:
+        wait_ready(port, args.path)
+        stop = threading.Event()
+        latencies, errors = [], []
+        threads = [threading.Thread(target=client, args=(port, args.path, stop, latencies, errors))
+                   for _ in range(args.clients)]
+        started = time.perf_counter()
+        for t in threads: t.start()
+        time.sleep(args.seconds)
+        stop.set()
+        for t in threads: t.join()
+        elapsed = time.perf_counter() - started
+    finally:
+        os.killpg(process.pid, signal.SIGTERM)
+        process.wait()
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'req_per_s': len(latencies) / elapsed,
+        'p50_ms': statistics.median(latencies) if latencies else None,
+        'p95_ms': latencies[int(len(latencies) * 0.95) - 1] if latencies else None,
+        'errors': len(errors),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--threads', type=int, default=8, help="threads do waitress no modo production")
+    parser.add_argument('--path', default='/api/tasks')
+    args = parser.parse_args()
+
+    print(f"GET {args.path}, {args.clients} clientes, {args.seconds:.0f} s por modo")
+    print(f"{'modo':12s} {'requests':>9s} {'req/s':>9s} {'p50 ms':>9s} {'p95 ms':>9s} {'erros':>7s}")
+    for mode in ('dev', 'production'):
+        with tempfile.TemporaryDirectory() as tmp:
+            db_copy = os.path.join(tmp, 'data.db')
+            shutil.copy(os.path.join(BACKEND_DIR, 'data.db'), db_copy)
+            result = run_mode(mode, args, db_copy)
+        print(f"{mode:12s} {result['requests']:>9d} {result['req_per_s']:>9.1f} "
+              f"{result['p50_ms'] or 0:>9.1f} {result['p95_ms'] or 0:>9.1f} {result['errors']:>7d}")
+
+
+if __name__ == '__main__':
+    main()
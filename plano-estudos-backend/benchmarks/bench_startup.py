@@ -0,0 +1,131 @@
+"""
+Benchmark: tempo de inicialização do backend.
+
+Para cada execução, sobe o backend num subprocesso novo (cópia temporária do
+data.db já migrada) e mede o tempo até o primeiro 200 em
+/api/dashboard/summary. Depois roda `python -X importtime` sobre o import do
+app.py e lista os módulos mais caros, indicando se pandas/numpy foram
+carregados na inicialização.
+
+Para comparar com outra versão do backend, aponte --app para o app.py dela:
+    git show <commit>:plano-estudos-backend/app.py > /tmp/app_antigo.py
+    python benchmarks/bench_startup.py --app /tmp/app_antigo.py
+
+Uso:
+    python benchmarks/bench_startup.py [--app caminho/app.py] [--runs 5] [--top 10]
+"""
+import argparse
+import os
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Executado no subprocesso: mesma sequência do __main__ do app.py, mas com o
+# servidor do werkzeug numa porta livre e sem o reloader do modo debug
+SERVER_SCRIPT = """
+import importlib.util, sys
+sys.path.insert(0, {backend_dir!r})
+spec = importlib.util.spec_from_file_location('app', {app_path!r})
+backend = importlib.util.module_from_spec(spec)
+sys.modules['app'] = backend
+spec.loader.exec_module(backend)
+if hasattr(backend, 'start_startup_checks'):
+    backend.start_startup_checks()
+else:
+    with backend.app.app_context():
+        backend.check_notifications()
+from werkzeug.serving import make_server
+make_server('127.0.0.1', {port}, backend.app, threaded=True).serve_forever()
+"""
+
+IMPORT_SCRIPT = """
+import importlib.util, sys
+sys.path.insert(0, {backend_dir!r})
+spec = importlib.util.spec_from_file_location('app', {app_path!r})
+backend = importlib.util.module_from_spec(spec)
+sys.modules['app'] = backend
+spec.loader.exec_module(backend)
+print('HEAVY', 'pandas' in sys.modules, 'numpy' in sys.modules)
+"""
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def time_to_first_200(app_path, env, timeout=60):
+    port = free_port()
+    script = SERVER_SCRIPT.format(backend_dir=BACKEND_DIR, app_path=app_path, port=port)
+    started = time.perf_counter()
+    process = subprocess.Popen([sys.executable, '-c', script], env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while time.perf_counter() - started < timeout:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/api/dashboard/summary", timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - started
+            except (urllib.error.URLError, ConnectionError, OSError):
+                time.sleep(0.005)
+        raise RuntimeError("o backend não respondeu dentro do tempo limite")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def import_profile(app_path, env, top):
+    script = IMPORT_SCRIPT.format(backend_dir=BACKEND_DIR, app_path=app_path)
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', script], env=env,
+                            capture_output=True, text=True, check=True)
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        modules.append((int(cumulative), name.rstrip()))
+    heavy = next(line for line in result.stdout.splitlines() if line.startswith('HEAVY')).split()[1:]
+    # Só os módulos de nível mais alto (importados diretamente pelo app.py)
+    depth = min(len(name) - len(name.lstrip()) for _, name in modules)
+    direct = sorted((m for m in modules if len(m[1]) - len(m[1].lstrip()) <= depth + 2), reverse=True)
+    return direct[:top], heavy
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--app', default=os.path.join(BACKEND_DIR, 'app.py'))
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=10)
+    args = parser.parse_args()
+    app_path = os.path.abspath(args.app)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_copy = os.path.join(tmp, 'data.db')
+        shutil.copy(os.path.join(BACKEND_DIR, 'data.db'), db_copy)
+        env = {**os.environ, 'PLANO_DB_FILE': db_copy}
+        # A primeira execução aplica as migrações pendentes; fica fora da medição
+        subprocess.run([sys.executable, '-c', IMPORT_SCRIPT.format(backend_dir=BACKEND_DIR, app_path=app_path)],
+                       env=env, capture_output=True, check=True)
+
+        samples = [time_to_first_200(app_path, env) for _ in range(args.runs)]
+        modules, (pandas_loaded, numpy_loaded) = import_profile(app_path, env, args.top)
+
+    print(f"tempo até o primeiro 200 (/api/dashboard/summary), {args.runs} execuções:")
+    print(f"    mediana {statistics.median(samples) * 1000:.0f} ms, mín {min(samples) * 1000:.0f} ms, máx {max(samples) * 1000:.0f} ms")
+    print(f"pandas carregado na inicialização: {pandas_loaded}, numpy: {numpy_loaded}")
+    print(f"imports mais caros (acumulado, ms):")
+    for cumulative, name in modules:
+        print(f"    {cumulative / 1000:8.1f}  {name}")
+
+
+if __name__ == '__main__':
+    main()
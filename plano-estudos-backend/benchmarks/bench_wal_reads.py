@@ -0,0 +1,108 @@
+"""
+Benchmark: latência de leitura de /api/dashboard/summary enquanto outras
+threads gravam sessões em /api/sessions/save.
+
+Roda cada perfil de armazenamento em um subprocesso, sempre sobre uma cópia
+temporária do data.db (o banco original não é alterado).
+
+Uso:
+    python benchmarks/bench_wal_reads.py [--seconds 5] [--writers 2]
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def run_profile(seconds, writers):
+    """Executado no subprocesso: PLANO_DB_FILE e PLANO_DB_PROFILE já definidos."""
+    sys.path.insert(0, BACKEND_DIR)
+    import app as backend
+    from werkzeug.serving import make_server
+
+    with backend.app.app_context():
+        task_id = backend.get_db_connection().execute("SELECT id FROM task ORDER BY id LIMIT 1").fetchone()['id']
+
+    server = make_server('127.0.0.1', 0, backend.app, threaded=True)
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    stop = threading.Event()
+    write_count = [0]
+
+    def writer():
+        payload = json.dumps({
+            'task_id': task_id, 'start': '2025-01-01T10:00:00Z',
+            'end': '2025-01-01T10:30:00Z', 'duration_minutes': 30,
+        }).encode()
+        while not stop.is_set():
+            req = urllib.request.Request(f"{base_url}/api/sessions/save", data=payload,
+                                         headers={'Content-Type': 'application/json'})
+            try:
+                urllib.request.urlopen(req).read()
+                write_count[0] += 1
+            except Exception:
+                pass
+
+    threads = [threading.Thread(target=writer, daemon=True) for _ in range(writers)]
+    for t in threads: t.start()
+
+    latencies, errors = [], 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            urllib.request.urlopen(f"{base_url}/api/dashboard/summary").read()
+            latencies.append((time.perf_counter() - started) * 1000)
+        except Exception:
+            errors += 1
+    stop.set()
+    for t in threads: t.join()
+    server.shutdown()
+
+    latencies.sort()
+    print(json.dumps({
+        'reads': len(latencies),
+        'errors': errors,
+        'writes': write_count[0],
+        'p50_ms': round(statistics.median(latencies), 2) if latencies else None,
+        'p95_ms': round(latencies[int(len(latencies) * 0.95) - 1], 2) if latencies else None,
+        'max_ms': round(latencies[-1], 2) if latencies else None,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--profile', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.profile:
+        run_profile(args.seconds, args.writers)
+        return
+
+    for profile in ('compat', 'performance'):
+        with tempfile.TemporaryDirectory() as tmp:
+            db_copy = os.path.join(tmp, 'data.db')
+            shutil.copy(os.path.join(BACKEND_DIR, 'data.db'), db_copy)
+            env = {**os.environ, 'PLANO_DB_FILE': db_copy, 'PLANO_DB_PROFILE': profile}
+            out = subprocess.run(
+                [sys.executable, __file__, '--profile', profile,
+                 '--seconds', str(args.seconds), '--writers', str(args.writers)],
+                env=env, capture_output=True, text=True, check=True,
+            ).stdout
+            print(f"{profile:12s} {out.strip().splitlines()[-1]}")
+
+
+if __name__ == '__main__':
+    main()
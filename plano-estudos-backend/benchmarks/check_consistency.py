@@ -0,0 +1,106 @@
+"""
+Verificação do motor incremental de evolução: sobe o backend sobre uma cópia
+temporária do data.db (aplicando as migrações, inclusive o rebuild único das
+tabelas de evolução) e confere /api/evolution/consistency logo na
+inicialização, antes de qualquer escrita, e depois de cada tipo de escrita
+que aplica deltas, inclusive duas escritas simultâneas na mesma tarefa.
+Termina com código 1 na primeira divergência.
+
+Uso:
+    python benchmarks/check_consistency.py [-v]
+"""
+import contextlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def concurrent_sessions(backend, task_id):
+    """
+    Duas sessões salvas ao mesmo tempo na mesma tarefa. A pausa depois de
+    cada leitura da pegada abre a janela em que a outra escrita entraria
+    entre o "antes" e o "depois" se a transação não segurasse o lock.
+    """
+    original = backend.get_task_footprint
+
+    def slow_footprint(conn, task_id):
+        footprint = original(conn, task_id)
+        time.sleep(0.2)
+        return footprint
+
+    responses = []
+    payload = {'task_id': task_id, 'start': '2025-03-10T14:00:00', 'end': '2025-03-10T15:00:00', 'duration_minutes': 60}
+    save = lambda: responses.append(backend.app.test_client().post('/api/sessions/save', json=payload))
+    backend.get_task_footprint = slow_footprint
+    try:
+        threads = [threading.Thread(target=save) for _ in range(2)]
+        for thread in threads: thread.start()
+        for thread in threads: thread.join()
+    finally:
+        backend.get_task_footprint = original
+    return max(responses, key=lambda response: response.status_code)
+
+
+def main():
+    verbose = '-v' in sys.argv
+    tmp = tempfile.mkdtemp()
+    db_copy = os.path.join(tmp, 'data.db')
+    shutil.copy(os.path.join(BACKEND_DIR, 'data.db'), db_copy)
+    os.environ['PLANO_DB_FILE'] = db_copy
+    sys.path.insert(0, BACKEND_DIR)
+    with contextlib.redirect_stdout(io.StringIO()):
+        import app as backend
+    client = backend.app.test_client()
+
+    with backend.app.app_context():
+        conn = backend.get_db_connection()
+        task = dict(conn.execute("SELECT id, discipline_id FROM task ORDER BY id LIMIT 1").fetchone())
+        other = dict(conn.execute("SELECT id, discipline_id FROM task ORDER BY id DESC LIMIT 1").fetchone())
+
+    steps = [
+        ('inicialização', None),
+        ('nova sessão', lambda: client.post('/api/sessions/save', json={
+            'task_id': task['id'], 'start': '2025-03-10T10:00:00', 'end': '2025-03-10T11:30:00', 'duration_minutes': 90})),
+        ('sessões simultâneas', lambda: concurrent_sessions(backend, task['id'])),
+        ('novo resultado', lambda: client.post('/api/results', json={'task_id': task['id'], 'correct': 7, 'total': 10})),
+        ('tarefa concluída', lambda: client.put(f"/api/tasks/{task['id']}", json={
+            'title': 'Tarefa', 'discipline_id': task['discipline_id'], 'status': 'Concluída',
+            'completion_date': '2025-03-11', 'carga_horaria_realizada_minutos': 45})),
+        ('carga sem data de conclusão', lambda: client.put(f"/api/tasks/{other['id']}", json={
+            'title': 'Tarefa', 'discipline_id': other['discipline_id'], 'status': 'Pendente',
+            'completion_date': None, 'carga_horaria_realizada_minutos': 100})),
+        ('troca de disciplina', lambda: client.put(f"/api/tasks/{task['id']}", json={
+            'title': 'Tarefa', 'discipline_id': other['discipline_id'], 'status': 'Concluída',
+            'completion_date': '2025-03-11', 'carga_horaria_realizada_minutos': 45})),
+        ('nova tarefa', lambda: client.post('/api/tasks', json={'title': 'Nova', 'discipline_id': task['discipline_id']})),
+        ('tarefa removida', lambda: client.delete(f"/api/tasks/{other['id']}")),
+        ('rebuild', lambda: client.post('/api/evolution/rebuild')),
+    ]
+
+    failures = 0
+    for name, write in steps:
+        if write is not None:
+            with contextlib.redirect_stdout(io.StringIO()):
+                response = write()
+            if response.status_code >= 400:
+                print(f"AVISO: '{name}' respondeu {response.status_code}")
+        report = client.get('/api/evolution/consistency').get_json()
+        status = 'ok' if report['consistent'] else 'DIVERGENTE'
+        print(f"{name:30s} {status}")
+        if not report['consistent']:
+            failures += 1
+            for difference in report['differences'][:None if verbose else 5]:
+                print(f"    {difference}")
+            break
+    shutil.rmtree(tmp, ignore_errors=True)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
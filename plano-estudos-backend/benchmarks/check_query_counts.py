@@ -0,0 +1,105 @@
+"""
+Verificação do número de consultas nas listagens de tarefas: conta as
+consultas SELECT emitidas por request (trace_callback da conexão) em
+/api/tasks, /api/tasks?status=..., /api/trilhas/<id>/tasks e
+/api/tasks/<id>, primeiro sobre uma cópia temporária do data.db e depois de
+inserir tarefas com tópicos suficientes para vários lotes de streaming.
+Cada endpoint deve fazer sempre EXPECTED_QUERIES consultas (tarefas e
+tópicos), qualquer que seja a quantidade de linhas. Termina com código 1 se
+algum não fizer.
+
+Uso:
+    python benchmarks/check_query_counts.py [--tasks 2000] [-v]
+"""
+import argparse
+import contextlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+EXPECTED_QUERIES = 2
+
+ENDPOINTS = [
+    '/api/tasks',
+    '/api/tasks?status=Pendente',
+    '/api/tasks?status=Concluída',
+    '/api/trilhas/1/tasks',
+    '/api/tasks/1',
+]
+
+
+def seed(conn, tasks):
+    """Tarefas na trilha 1, metade concluídas, cada uma com até dois tópicos."""
+    discipline_id = conn.execute("SELECT id FROM discipline ORDER BY id LIMIT 1").fetchone()[0]
+    topic_ids = [row[0] for row in conn.execute("SELECT id FROM topic ORDER BY id LIMIT 2")]
+    for index in range(tasks):
+        done = index % 2 == 0
+        task_id = conn.execute(
+            "INSERT INTO task (title, discipline_id, trilha_id, status, completion_date) VALUES (?, ?, 1, ?, ?)",
+            (f"Tarefa sintética {index}", discipline_id, 'Concluída' if done else 'Pendente',
+             '2025-02-01' if done else None)).lastrowid
+        conn.executemany("INSERT INTO task_topics (task_id, topic_id) VALUES (?, ?)",
+                         [(task_id, topic_id) for topic_id in topic_ids])
+    conn.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--tasks', type=int, default=2000)
+    parser.add_argument('-v', '--verbose', action='store_true')
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    db_copy = os.path.join(tmp, 'data.db')
+    shutil.copy(os.path.join(BACKEND_DIR, 'data.db'), db_copy)
+    os.environ['PLANO_DB_FILE'] = db_copy
+    sys.path.insert(0, BACKEND_DIR)
+    with contextlib.redirect_stdout(io.StringIO()):
+        import app as backend
+
+    captured = []
+    original_factory = backend.db_pool._factory
+
+    def tracing_factory():
+        conn = original_factory()
+        conn.set_trace_callback(captured.append)
+        return conn
+
+    backend.db_pool._factory = tracing_factory
+    # Conexões já abertas na inicialização não teriam o trace; descarta-as
+    while backend.db_pool._idle:
+        backend.db_pool._discard(backend.db_pool.acquire())
+    client = backend.app.test_client()
+
+    def run(label):
+        failures = 0
+        for path in ENDPOINTS:
+            captured.clear()
+            response = client.get(path)
+            # As listagens vêm em streaming: as consultas só terminam ao ler o corpo
+            body = response.get_json()
+            response.close()
+            queries = [q for q in captured if q.lstrip().upper().startswith(('SELECT', 'WITH'))]
+            rows = len(body) if isinstance(body, list) else 1
+            ok = response.status_code < 400 and len(queries) == EXPECTED_QUERIES
+            print(f"[{label}] {path:32s} {rows:6d} linhas  {len(queries)} consultas  {'ok' if ok else 'FALHA'}")
+            if args.verbose or not ok:
+                for query in queries: print(f"    {' '.join(query.split())}")
+            failures += not ok
+        return failures
+
+    failures = run('base')
+    conn = original_factory()
+    seed(conn, args.tasks)
+    conn.close()
+    failures += run(f"+{args.tasks} tarefas")
+    shutil.rmtree(tmp, ignore_errors=True)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+"""
+Verificação de planos de consulta: executa os endpoints da API sobre uma cópia
+temporária do data.db, captura todas as consultas SQL emitidas e roda
+EXPLAIN QUERY PLAN em cada uma. Termina com código 1 se alguma consulta fizer
+varredura completa (SCAN) de uma tabela de fatos sem usar índice.
+
+Uso:
+    python benchmarks/check_query_plans.py [-v]
+"""
+import os
+import re
+import shutil
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Tabelas que crescem com o uso; nelas uma varredura completa é regressão
+FACT_TABLES = {'task', 'task_topics', 'study_session', 'result', 'notification', 'review', 'performance_history',
+               'topic_performance_daily', 'daily_stats'}
+
+# Consultas que precisam percorrer a tabela inteira por definição
+# (listagens sem filtro e totais gerais)
+ALLOWED_FULL_SCANS = [
+    re.compile(r'^SELECT \* FROM task ORDER BY', re.I),
+    re.compile(r'FROM task_topics tt JOIN topic t ON t\.id = tt\.topic_id ORDER BY', re.I),
+    re.compile(r'^SELECT COUNT\(\*\) as total\s+FROM result\s*$', re.I),
+    re.compile(r'SUM\(duration_minutes\) / 60\.0 as total_hours\s+FROM study_session\s*$', re.I),
+    re.compile(r'FROM review r LEFT JOIN task', re.I),
+    re.compile(r'FROM trilha tr\s+LEFT JOIN task', re.I),
+]
+
+SQL_KEYWORDS = {'WHERE', 'ON', 'JOIN', 'LEFT', 'INNER', 'GROUP', 'ORDER', 'LIMIT', 'USING', 'AS', 'UNION'}
+
+ENDPOINTS = [
+    ('GET', '/api/dashboard/summary', None),
+    ('GET', '/api/trilhas', None),
+    ('GET', '/api/trilhas/1/tasks', None),
+    ('GET', '/api/disciplines', None),
+    ('GET', '/api/topics', None),
+    ('GET', '/api/disciplines/1/topics', None),
+    ('GET', '/api/tasks', None),
+    ('GET', '/api/tasks?status=Pendente', None),
+    ('GET', '/api/tasks?status=Concluída', None),
+    ('GET', '/api/tasks/1', None),
+    ('GET', '/api/sessions/history', None),
+    ('GET', '/api/reviews?from=2025-01-01&to=2025-12-31', None),
+    ('GET', '/api/evolution', None),
+    ('GET', '/api/notifications', None),
+    ('GET', '/api/notifications?unread=0&type=performance&limit=10', None),
+    ('GET', '/api/sessions/history?discipline_id=1&limit=10', None),
+    ('GET', '/api/topics/performance', None),
+    ('GET', '/api/topics/performance?days=30', None),
+    ('GET', '/api/goals', None),
+    ('GET', '/api/goals/progress', None),
+    ('GET', '/api/performance/history', None),
+    ('GET', '/api/performance/history?discipline_id=1&days=90', None),
+    ('GET', '/api/stats/rollup?period=week', None),
+    ('GET', '/api/stats/rollup?period=month&periods=6&discipline_id=1', None),
+    ('POST', '/api/sessions/save', {'task_id': 1, 'start': '2025-01-01T10:00:00Z',
+                                    'end': '2025-01-01T12:30:00Z', 'duration_minutes': 150}),
+    ('POST', '/api/results', {'task_id': 1, 'correct': 8, 'total': 10}),
+    ('POST', '/api/notifications/check', None),
+]
+
+
+def table_aliases(query):
+    """Mapeia alias -> tabela, pois o plano mostra o alias (ex.: 'SCAN s')."""
+    aliases = {}
+    for table, alias in re.findall(r'\b(?:FROM|JOIN)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?', query, re.I):
+        aliases[table] = table
+        if alias and alias.upper() not in SQL_KEYWORDS:
+            aliases[alias] = table
+    return aliases
+
+
+def is_full_scan(step, query):
+    """
+    Um passo 'SCAN <tabela de fatos>' percorre a tabela inteira. A única
+    exceção é percorrer um índice em ordem com LIMIT (para após N linhas).
+    """
+    match = re.match(r'SCAN (\w+)', step)
+    if not match or table_aliases(query).get(match.group(1), match.group(1)) not in FACT_TABLES:
+        return False
+    return not ('INDEX' in step and re.search(r'\bLIMIT\b', query, re.I))
+
+
+def main():
+    verbose = '-v' in sys.argv
+    tmp = tempfile.mkdtemp()
+    db_copy = os.path.join(tmp, 'data.db')
+    shutil.copy(os.path.join(BACKEND_DIR, 'data.db'), db_copy)
+    os.environ['PLANO_DB_FILE'] = db_copy
+    sys.path.insert(0, BACKEND_DIR)
+    import app as backend
+
+    captured = []
+    original_factory = backend.db_pool._factory
+
+    def tracing_factory():
+        conn = original_factory()
+        conn.set_trace_callback(captured.append)
+        return conn
+
+    backend.db_pool._factory = tracing_factory
+    # Conexões já abertas na inicialização não teriam o trace; descarta-as
+    while backend.db_pool._idle:
+        backend.db_pool._discard(backend.db_pool.acquire())
+    client = backend.app.test_client()
+    for method, path, payload in ENDPOINTS:
+        response = client.open(path, method=method, json=payload)
+        # Lê e fecha as respostas em streaming na ordem dos requests
+        response.get_data()
+        response.close()
+        if response.status_code >= 400:
+            print(f"AVISO: {method} {path} respondeu {response.status_code}")
+
+    queries = sorted({q.strip() for q in captured if q.lstrip().upper().startswith(('SELECT', 'WITH'))})
+    conn = original_factory()
+    failures = []
+    for query in queries:
+        plan = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {query}")]
+        scans = [step for step in plan if is_full_scan(step, query)]
+        allowed = any(pattern.search(query) for pattern in ALLOWED_FULL_SCANS)
+        if verbose or (scans and not allowed):
+            print('-' * 70)
+            print(' '.join(query.split()))
+            for step in plan: print(f"    {step}")
+        if scans and not allowed:
+            failures.append(query)
+    conn.close()
+    shutil.rmtree(tmp, ignore_errors=True)
+
+    print('=' * 70)
+    print(f"{len(queries)} consultas verificadas, {len(failures)} com varredura completa.")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -14,7 +14,7 @@ export function AddResultCard({ onDataChange }) {
 
   useEffect(() => {
     // Carrega tarefas pendentes para o seletor
-    api("/tasks?status=Pendente").then(setTasks);
+    api("/tasks?status=Pendente&fields=id,title").then(setTasks);
   }, []);
 
   const handleSave = async () => {
@@ -1,30 +1,79 @@
 // src/Importer.jsx
-import React, { useState } from 'react';
-import { api } from './api';
+import React, { useState, useEffect, useRef } from 'react';
+import { api, syncJobEvents, cancelSyncJob } from './api';
 import { Card, Button } from './components';
 import { UploadCloud, CalendarClock } from 'lucide-react';
 
+const PHASES = {
+  queued: "Na fila",
+  reading: "Lendo planilha",
+  disciplines: "Importando disciplinas",
+  importing: "Importando tarefas",
+  evolution: "Atualizando evolução",
+};
+
 export function Importer({ onSync }) {
   const [busy, setBusy] = useState(false);
   const [msg, setMsg] = useState("");
+  const [jobId, setJobId] = useState(null);
+  const source = useRef(null);
+
+  useEffect(() => () => source.current && source.current.close(), []);
+
+  const follow = (id) => {
+    setJobId(id);
+    const events = syncJobEvents(id);
+    source.current = events;
+    events.addEventListener("progress", (ev) => {
+      const job = JSON.parse(ev.data);
+      if (job.status === "completed") {
+        const c = job.changes || {};
+        setMsg(`Sincronização concluída! ${c.inserted || 0} novas, ${c.updated || 0} alteradas, ${c.deleted || 0} removidas.`);
+        if (onSync) onSync();
+      } else if (job.status === "failed") {
+        setMsg(`Erro: ${job.error}`);
+      } else if (job.status === "cancelled") {
+        setMsg("Sincronização cancelada.");
+      } else {
+        const rows = job.rows_total ? ` (${job.rows_processed}/${job.rows_total} linhas)` : "";
+        setMsg(`${PHASES[job.phase] || "Sincronizando"}...${rows}`);
+        return;
+      }
+      events.close();
+      setBusy(false); setJobId(null);
+    });
+    events.onerror = () => {
+      if (events.readyState === EventSource.CLOSED) {
+        setMsg("Conexão com a sincronização perdida.");
+        setBusy(false); setJobId(null);
+      }
+    };
+  };
 
   const doImport = async () => {
     setBusy(true); setMsg("Sincronizando...");
     try {
-      await api("/sync", { method: "POST" });
-      setMsg(`Sincronização concluída!`);
-      if (onSync) onSync();
-    } catch (e) { 
-      setMsg(`Erro: ${String(e)}`); 
-    } finally { 
-      setBusy(false); 
+      const res = await api("/sync", { method: "POST" });
+      follow(res.job.id);
+    } catch (e) {
+      // 409: já existe uma sincronização em andamento; passa a acompanhá-la
+      let running = null;
+      try { running = JSON.parse(e.message).job; } catch (_) { }
+      if (running) follow(running.id);
+      else { setMsg(`Erro: ${String(e)}`); setBusy(false); }
     }
   };
 
+  const doCancel = async () => {
+    if (!jobId) return;
+    try { await cancelSyncJob(jobId); } catch (e) { setMsg(`Erro: ${String(e)}`); }
+  };
+
   return (
       <div className="importer-controls">
         <Button onClick={doImport} disabled={busy}><UploadCloud />Sincronizar com Planilha</Button>
+        {busy && jobId && <Button onClick={doCancel}>Cancelar</Button>}
         {msg && <p className="sync-message">{msg}</p>}
       </div>
   );
-}
\ No newline at end of file
+}
@@ -1,6 +1,6 @@
 // src/NotificationsPanel.jsx
 import React, { useState, useEffect, useRef } from 'react';
-import { api } from './api';
+import { api, notificationEvents } from './api';
 import { Bell, X, Check, AlertTriangle, Target, Calendar, Trophy } from 'lucide-react';
 import { Button } from './components';
 import { useOnClickOutside } from './hooks';
@@ -10,27 +10,62 @@ export function NotificationsPanel() {
     const [showPanel, setShowPanel] = useState(false);
     const [unreadCount, setUnreadCount] = useState(0);
     const [loading, setLoading] = useState(true);
+    const [nextCursor, setNextCursor] = useState(null);
     const panelRef = useRef(null);
 
     useOnClickOutside(panelRef, () => setShowPanel(false));
 
     useEffect(() => {
-        loadNotifications();
-        // Recarrega notificações a cada 5 minutos
-        const interval = setInterval(loadNotifications, 5 * 60 * 1000);
-        return () => clearInterval(interval);
+        let events = null;
+        let closed = false;
+        // Carrega as pendentes uma vez e depois recebe as novas por push (SSE)
+        loadNotifications().then((data) => {
+            if (closed) return;
+            const lastId = data.reduce((max, n) => Math.max(max, n.id), 0);
+            events = notificationEvents(lastId);
+            events.addEventListener('notification', (ev) => {
+                const notification = JSON.parse(ev.data);
+                setNotifications(current => current.some(n => n.id === notification.id)
+                    ? current
+                    : [notification, ...current]);
+            });
+            events.addEventListener('read', (ev) => {
+                const { ids } = JSON.parse(ev.data);
+                setNotifications(current => current.filter(n => !ids.includes(n.id)));
+            });
+        });
+        return () => {
+            closed = true;
+            if (events) events.close();
+        };
     }, []);
 
+    useEffect(() => {
+        setUnreadCount(notifications.filter(n => !n.read).length);
+    }, [notifications]);
+
     const loadNotifications = async () => {
         try {
             setLoading(true);
-            const data = await api('/notifications');
-            setNotifications(data);
-            setUnreadCount(data.filter(n => !n.read).length);
+            const page = await api('/notifications');
+            setNotifications(page.items);
+            setNextCursor(page.next_cursor);
             setLoading(false);
+            return page.items;
         } catch (e) {
             console.error('Erro ao carregar notificações:', e);
             setLoading(false);
+            return [];
+        }
+    };
+
+    const loadMore = async () => {
+        try {
+            const page = await api(`/notifications?cursor=${encodeURIComponent(nextCursor)}`);
+            setNotifications(current => [...current, ...page.items.filter(n => !current.some(c => c.id === n.id))]);
+            setNextCursor(page.next_cursor);
+        } catch (e) {
+            console.error('Erro ao carregar mais notificações:', e);
         }
     };
 
@@ -40,7 +75,7 @@ export function NotificationsPanel() {
                 method: 'POST',
                 body: JSON.stringify({ ids })
             });
-            await loadNotifications();
+            setNotifications(current => current.filter(n => !ids.includes(n.id)));
         } catch (e) {
             console.error('Erro ao marcar notificações como lidas:', e);
         }
@@ -164,6 +199,11 @@ export function NotificationsPanel() {
                                     </div>
                                 ))}
                             </div>
+                            {nextCursor && (
+                                <Button variant="ghost" onClick={loadMore}>
+                                    Carregar mais
+                                </Button>
+                            )}
                             {notifications.some(n => !n.read) && (
                                 <div className="notifications-footer">
                                     <Button
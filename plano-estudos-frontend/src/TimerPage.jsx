@@ -70,6 +70,7 @@ export function TimerPage({ keyProp }) {
   const [tasks, setTasks] = useState([]);
   const [selectedTaskId, setSelectedTaskId] = useState("");
   const [history, setHistory] = useState([]); // Novo estado para o histórico
+  const [nextCursor, setNextCursor] = useState(null);
   const [loading, setLoading] = useState(true);
 
   const loadPageData = async () => {
@@ -77,11 +78,12 @@ export function TimerPage({ keyProp }) {
     try {
       // Busca tarefas pendentes e o histórico em paralelo
       const [tasksData, historyData] = await Promise.all([
-        api("/tasks?status=Pendente"),
+        api("/tasks?status=Pendente&fields=id,title"),
         api("/sessions/history")
       ]);
       setTasks(tasksData || []);
-      setHistory(historyData || []);
+      setHistory(historyData.items || []);
+      setNextCursor(historyData.next_cursor);
     } catch(e) {
       console.error("Erro ao carregar dados da página de sessões:", e);
     } finally {
@@ -89,6 +91,17 @@ export function TimerPage({ keyProp }) {
     }
   };
   
+  // Próxima página do histórico (paginação por cursor)
+  const loadMoreHistory = async () => {
+    try {
+      const page = await api(`/sessions/history?cursor=${encodeURIComponent(nextCursor)}`);
+      setHistory(current => [...current, ...page.items]);
+      setNextCursor(page.next_cursor);
+    } catch (e) {
+      console.error("Erro ao carregar mais sessões:", e);
+    }
+  };
+
   // Recarrega os dados quando a chave de refresh mudar ou quando uma sessão terminar
   useEffect(() => {
     loadPageData();
@@ -117,6 +130,7 @@ export function TimerPage({ keyProp }) {
 
       <Card title="Últimas Sessões Salvas" icon={<ListChecks />}>
         {loading ? <p>Carregando histórico...</p> : <SessionHistory sessions={history} />}
+        {!loading && nextCursor && <Button variant="ghost" onClick={loadMoreHistory}>Carregar mais</Button>}
       </Card>
     </div>
   );
@@ -102,7 +102,10 @@ export function TrailsPage({ keyProp, onEditTask, onTimerToggle, activeSession }
           icon={<GitMerge />}
           action={<span className={`status-badge status-${trilha.status.toLowerCase()}`}>{trilha.status}</span>}
         >
-          <p style={{ minHeight: '40px' }}>Verifique o andamento das tarefas desta trilha.</p>
+          <p style={{ minHeight: '40px' }}>
+            {trilha.completed_tasks} de {trilha.pending_tasks + trilha.completed_tasks} tarefas concluídas
+            {' · '}{(trilha.realized_minutes / 60).toFixed(1)}h de {(trilha.planned_minutes / 60).toFixed(1)}h planejadas
+          </p>
           <div className="card-footer">
             <Button onClick={() => handleSelectTrilha(trilha)}>Ver Tarefas</Button>
           </div>
@@ -19,6 +19,20 @@ export async function api(path, opts = {}) {
   return text ? JSON.parse(text) : {};
 }
 
+// Acompanha uma sincronização em segundo plano (Server-Sent Events)
+export function syncJobEvents(jobId) {
+  return new EventSource(`${API_BASE_URL}/api/sync/jobs/${jobId}/events`);
+}
+
+export function cancelSyncJob(jobId) {
+  return api(`/sync/jobs/${jobId}/cancel`, { method: 'POST' });
+}
+
+// Notificações novas por push (Server-Sent Events); lastId = última já carregada
+export function notificationEvents(lastId) {
+  return new EventSource(`${API_BASE_URL}/api/notifications/stream?last_id=${lastId || 0}`);
+}
+
 export function getNotifications() {
   return api('/notifications');
 }